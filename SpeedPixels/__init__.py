@@ -0,0 +1,12 @@
+__all__ = ()
+
+import os
+import sys
+
+# modules import each other as top-level ones (the game is run as "python SpeedPixels"),
+# so running them as "python -m SpeedPixels.<module>" needs their directory on path.
+# argv[0] is "-m" only while the package of such module is imported, so other importers of the package
+# do not get its modules shadowing their own ones
+_SOURCES_DIR = os.path.dirname(os.path.abspath(__file__))
+if sys.argv[:1] == ['-m'] and _SOURCES_DIR not in sys.path:
+    sys.path.insert(0, _SOURCES_DIR)
@@ -5,15 +5,30 @@ __title__ = 'SpeedPixel'
 __version__ = '3.11'
 
 import sys
+import time
 
-from PyQt5.QtWidgets import QApplication
 
-from utils import load_menu
+def main():
+    start_ns = time.perf_counter_ns()
+    profile = '--profile-startup' in sys.argv
+    if profile:
+        sys.argv.remove('--profile-startup')
 
+    # imported here, so startup profile covers them. Art windows module is imported on first art opening
+    from PyQt5.QtWidgets import QApplication
+    from utils import StartupProfiler, navigator
 
-def main():
+    profiler = StartupProfiler(start_ns)
+    profiler.mark('imports')
     app = QApplication(sys.argv)
-    load_menu()
+    profiler.mark('application')
+    navigator.show_menu()
+    profiler.mark('menu shown')
+
+    if profile:
+        profiler.watch_first_paint(navigator.menu)
+        navigator.menu.loaded.connect(lambda: (profiler.mark('menu loaded'), print(profiler.report())))
+
     sys.exit(app.exec_())
 
 
@@ -6,16 +6,23 @@ __all__ = (
 )
 
 import os
-from typing import ParamSpec, Generator
-
-import keyboard
-from PyQt5.QtCore import Qt, QEvent, pyqtSignal, QSize
-from PyQt5.QtGui import QPixmap, QColor, QIcon, QResizeEvent
+import time
+from array import array
+from collections import deque
+from typing import ParamSpec
+
+from PyQt5.QtCore import Qt, QEvent, QTimer, pyqtSignal, QSize, QRect, QPoint
+from PyQt5.QtGui import (QColor, QIcon, QHideEvent, QKeyEvent, QResizeEvent, QMouseEvent, QPaintEvent, QPainter, QPen,
+                         QImage)
 from PyQt5.QtWidgets import (QWidget, QPushButton, QVBoxLayout, QInputDialog, QColorDialog, QLabel,
                              QGridLayout, QSizePolicy, QHBoxLayout, QMessageBox)
 
-from constants import BORDER_SIZE, CUSTOM, CELLS_NUM, MEDIA_URL, NOT_PROVIDED, Theme
-from utils import Countdown, DataBase, Timer, update_stylesheet, load_menu, set_text_color
+from assets import assets
+from board import BoardState, Click, is_pb
+from constants import (BORDER_SIZE, COUNTDOWN_FRAMES, CUSTOM, CELLS_NUM, MAX_COLORS_NUM, MEDIA_URL, NOT_PROVIDED,
+                       PALETTE_IMAGE, Theme)
+from recording import Ghost, RunRecorder, load_pb, verify
+from utils import Countdown, DataBase, PackedArt, Timer, navigator, persistence, update_stylesheet, set_text_color
 
 P = ParamSpec('P')
 
@@ -23,124 +30,223 @@ db = DataBase()
 theme = Theme(db.get_setting_value('theme'))
 
 
-class Cell(QPushButton):
+class PixelGridWidget(QWidget):
+    """
+    Field cells painted by a single widget, game rules and cells state are kept by BoardState.
+    Cells under the cursor are found arithmetically and only changed cells are repainted.
+
+    Cells big enough are painted one by one with their borders. Smaller cells (on big fields) are painted
+    by scaling images made straight from the board arrays, so painting cost does not depend on number of cells.
+    """
+
+    released = pyqtSignal(int)  # index of released cell
+    SPACING = 2  # px between cells
+    BORDERED_CELL_MIN_SIZE = 12  # px
 
-    def __init__(self, field: Field) -> None:
+    def __init__(self, field: Field, cells_num: tuple[int, int] = CELLS_NUM) -> None:
         super().__init__(field.parent())
-        self.parent = lambda: field
-        self._position = field.count() - 1
 
-        self._color = theme.CELL_DEFAULT_COLOR
-        self._saved_color = theme.CELL_DEFAULT_COLOR
-        self.save()  # shortcut for setting up border
+        self.board = BoardState(cells_num)
+        self._columns, self._rows = cells_num
+        self._saved_palette: tuple[tuple[int, ...], tuple[QColor, ...]] = ((), ())  # board palette -> its QColors
+        self.ghost: array | None = None  # colors of replayed best run, shown over empty cells
+        self._pressed: int | None = None
 
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
-        self.released.connect(self._callback)
+    def __len__(self) -> int:
+        return len(self.board)
 
     @property
-    def color(self) -> QColor:
-        return self._color
+    def colors(self) -> array:
+        return self.board.colors
 
-    @color.setter
-    def color(self, value: QColor) -> None:
-        self._color = value
-        self._draw()
+    @property
+    def saved_colors(self) -> array:
+        return self.board.saved_colors
 
     @property
-    def saved_color(self) -> QColor:
-        return self._saved_color
+    def cells_num(self) -> tuple[int, int]:
+        return self.board.cells_num
 
-    def is_painted(self) -> bool:
-        return self._color != theme.CELL_DEFAULT_COLOR
+    def set_cells_num(self, cells_num: tuple[int, int]) -> None:
+        self.board.resize(cells_num)
+        self._columns, self._rows = cells_num
+        self.update()
 
-    def is_saved(self) -> bool:
-        return self._saved_color != theme.CELL_DEFAULT_COLOR
+    def cell_rect(self, index: int) -> QRect:
+        column, row = index % self._columns, index // self._columns
+        left, right = column * self.width() // self._columns, (column + 1) * self.width() // self._columns
+        top, bottom = row * self.height() // self._rows, (row + 1) * self.height() // self._rows
+        return QRect(left, top, right - left, bottom - top)
 
-    def save(self) -> None:
-        self._saved_color = self.color
-        self.color = theme.CELL_DEFAULT_COLOR
-        if self.is_saved():
-            update_stylesheet(self, f'border: 3px solid {self._saved_color.name()};')
-        else:
-            update_stylesheet(self, 'border: 1px solid black')
+    # Inverse of cell_rect: the last column (row) which starts at or before the given pixel
+    def _column_at(self, x: int) -> int:
+        return ((x + 1) * self._columns - 1) // self.width()
 
-    def _draw(self) -> None:
-        update_stylesheet(self, f'background-color: {self.color.name()};')
+    def _row_at(self, y: int) -> int:
+        return ((y + 1) * self._rows - 1) // self.height()
 
-    # color validation lies on PixelArt class
-    def _callback(self) -> None:
-        if self.is_painted():
-            self.color = theme.CELL_DEFAULT_COLOR
+    def cell_at(self, pos: QPoint) -> int | None:
+        if not self.rect().contains(pos):
             return
-        current_color = self.parent().parent().user_color
-        if self.is_saved() and current_color != self._saved_color:
-            return
-        self.color = current_color
+        return self._row_at(pos.y()) * self._columns + self._column_at(pos.x())
+
+    def click(self, index: int, rgb: int) -> Click:
+        result = self.board.click(index, rgb)
+        if result not in (Click.IGNORED, Click.OVERFLOW):  # overflowing click is reverted by the board
+            self.update(self.cell_rect(index).adjusted(-1, -1, 1, 1))  # margin covers rounding of scaled images
+        return result
+
+    def update_cells(self, indices: list[int]) -> None:
+        for index in indices:
+            self.update(self.cell_rect(index).adjusted(-1, -1, 1, 1))
+
+    def set_colors(self, values: array | int) -> None:  # int value is set to every cell
+        self.board.set_colors(values)
+        self.update()
+
+    def set_saved_colors(self, values: array | int) -> None:  # int value is set to every cell
+        self.board.set_saved_colors(values)
+        self.update()
+
+    @property
+    def saved_palette(self) -> tuple[QColor, ...]:
+        palette = self.board.palette
+        if self._saved_palette[0] is not palette:
+            self._saved_palette = palette, tuple(map(QColor.fromRgb, palette))
+        return self._saved_palette[1]
+
+    def mousePressEvent(self, e: QMouseEvent) -> None:
+        self._pressed = self.cell_at(e.pos()) if e.button() == Qt.LeftButton else None
+
+    def mouseReleaseEvent(self, e: QMouseEvent) -> None:
+        # same as for buttons, click counts only if it was released over the pressed cell
+        index, self._pressed = self._pressed, None
+        if index is not None and e.button() == Qt.LeftButton and self.cell_at(e.pos()) == index:
+            self.released.emit(index)
+
+    def paintEvent(self, e: QPaintEvent) -> None:
+        painter = QPainter(self)
+        if min(self.width() // self._columns, self.height() // self._rows) < self.BORDERED_CELL_MIN_SIZE:
+            self._paint_images(painter, e.rect())
+        else:
+            self._paint_cells(painter, e.rect())
+
+    def _image(self, values: array) -> tuple[QImage, bytes]:
+        # QRgb arrays are laid out the same way as ARGB32 image, data must be alive while image is painted
+        data = values.tobytes()
+        return QImage(data, self._columns, self._rows, self._columns * 4, QImage.Format_ARGB32), data
+
+    def _paint_images(self, painter: QPainter, area: QRect) -> None:
+        # painter is clipped to the dirty area, so scaling is done for changed cells only
+        painter.fillRect(area, theme.CELL_DEFAULT_COLOR)
+        saved_image, _saved_data = self._image(self.saved_colors)
+        image, _data = self._image(self.colors)
+        painter.setOpacity(0.35)  # cells to be painted are hinted with their colors
+        painter.drawImage(self.rect(), saved_image)
+        if self.ghost is not None:
+            ghost_image, _ghost_data = self._image(self.ghost)  # other colors of ghost have zero alpha
+            painter.setOpacity(0.7)
+            painter.drawImage(self.rect(), ghost_image)
+        painter.setOpacity(1)
+        painter.drawImage(self.rect(), image)
+
+    def _paint_cells(self, painter: QPainter, area: QRect) -> None:
+        # only cells intersecting with dirty area are painted
+        area = area.intersected(self.rect())
+        first_column, last_column = self._column_at(area.left()), self._column_at(area.right())
+        first_row, last_row = self._row_at(area.top()), self._row_at(area.bottom())
+
+        default, ghost = theme.CELL_DEFAULT_COLOR, self.ghost
+        for row in range(first_row, last_row + 1):
+            for index in range(row * self._columns + first_column, row * self._columns + last_column + 1):
+                rect = self.cell_rect(index).adjusted(0, 0, -self.SPACING, -self.SPACING)
+                color, saved_color = self.colors[index], self.saved_colors[index]
+                painter.fillRect(rect, QColor.fromRgb(color) if color else default)
+                if ghost is not None and not color and ghost[index] and ghost[index] == saved_color:
+                    margin = rect.width() // 3  # ghost cells are marked with squares of their colors
+                    painter.fillRect(rect.adjusted(margin, margin, -margin, -margin), QColor.fromRgb(saved_color))
+                if saved_color:
+                    painter.setPen(QPen(QColor.fromRgb(saved_color), 3))
+                    painter.drawRect(rect.adjusted(1, 1, -2, -2))
+                else:
+                    painter.setPen(Qt.black)
+                    painter.drawRect(rect.adjusted(0, 0, -1, -1))
 
 
 class Field(QGridLayout):
+    clicked = pyqtSignal(int, 'quint32')  # index of cell and QRgb value (unsigned) of color it was clicked with
     filled = pyqtSignal()
 
-    def __init__(self, art: QWidget) -> None:
+    def __init__(self, art: QWidget, cells_num: tuple[int, int] = CELLS_NUM) -> None:
         super().__init__(art)
         self.parent = lambda: art
 
-        for row in range(1, CELLS_NUM[0] + 1):
-            for col in range(1, CELLS_NUM[1] + 1):
-                cell = Cell(self)
-                cell.released.connect(self._child_on_click)
-                self.addWidget(cell, row, col)
+        self._grid = PixelGridWidget(self, cells_num)
+        self._grid.released.connect(self._child_on_click)
+        self.addWidget(self._grid, 0, 0)
+
+    @staticmethod
+    def _to_rgb(color: QColor) -> int:
+        return 0 if color == theme.CELL_DEFAULT_COLOR else color.rgb()
 
-    def prepare(self, prep: dict[int, QColor]) -> None:
-        for k, v in prep.items():
-            self.itemAt(k).widget().color = v
+    @property
+    def cells_num(self) -> tuple[int, int]:
+        return self._grid.cells_num
 
     @property
-    def used_colors(self) -> list[QColor]:
-        used = []
-        used_hex_codes = set()
+    def board(self) -> BoardState:
+        return self._grid.board
 
-        for color in self._get_saved_colors_and_positions().values():
-            if color.name() not in used_hex_codes:
-                used_hex_codes.add(color.name())
-                used.append(color)
+    def set_ghost(self, ghost: Ghost | None) -> None:
+        self._grid.ghost = ghost.colors if ghost is not None else None
+        self._grid.update()
 
-        return used
+    def update_cells(self, indices: list[int]) -> None:
+        self._grid.update_cells(indices)
 
-    def _cells(self) -> Generator[Cell]:
-        for position in range(self.count()):
-            yield self.itemAt(position).widget()
+    def reset(self, cells_num: tuple[int, int]) -> None:
+        # field of reused art window is emptied before another art is loaded into it
+        self._grid.set_cells_num(cells_num)
 
-    def _get_saved_colors_and_positions(self) -> dict[int, QColor]:
-        return dict((idx, cell.saved_color) for idx, cell in enumerate(self._cells()) if cell.is_saved())
+    def prepare(self, prep: PackedArt) -> None:
+        if prep.cells_num != self.cells_num:
+            self._grid.set_cells_num(prep.cells_num)
+        self._grid.set_colors(prep.to_rgb())
+
+    @property
+    def used_colors(self) -> tuple[QColor, ...]:
+        return self._grid.saved_palette
 
     def _is_filled(self) -> bool:
-        return self.is_saved() and all(cell.color == cell.saved_color for cell in self._cells())
+        return self._grid.board.is_filled
 
-    def _child_on_click(self):
-        if self._is_filled():
+    # color validation lies on PixelArt class
+    def _child_on_click(self, index: int) -> None:
+        rgb = self._to_rgb(self.parent().user_color)
+        self.clicked.emit(index, rgb)
+        result = self._grid.click(index, rgb)
+        if result == Click.FILLED:
             self.filled.emit()
-        if len(set(cell.color.name() for cell in self._cells())) - 1 > 9:
-            QMessageBox.information(self.parent(), 'Error', 'Pixel art can only contain a maximum of 9 colors',
+        elif result == Click.OVERFLOW:
+            QMessageBox.information(self.parent(), 'Error',
+                                    f'Pixel art can only contain a maximum of {MAX_COLORS_NUM} colors',
                                     QMessageBox.Ok, QMessageBox.Ok)
-            self.sender().released.emit()  # type: ignore
 
     def is_saved(self) -> bool:
-        return any(cell.is_saved() for cell in self._cells())
+        return self._grid.board.is_saved
 
     def paint(self) -> None:
-        for cell in self._cells():
-            cell.save()
+        self._grid.board.paint()
+        self._grid.update()
 
     def clear(self) -> None:
-        for cell in self._cells():
-            cell.color = theme.CELL_DEFAULT_COLOR
-            cell.save()
+        self._grid.board.clear()
+        self._grid.update()
 
-    def save(self) -> tuple[str, dict[int, QColor]] | None:
-        clrs = self._get_saved_colors_and_positions()
-        if not clrs:
+    def save(self) -> tuple[str, PackedArt] | None:
+        if not self.is_saved():
             QMessageBox.question(self.parent(), 'Error', 'To save pixel art, at least one color must be saved',
                                  QMessageBox.Ok, QMessageBox.Ok)
             return
@@ -155,53 +261,55 @@ class Field(QGridLayout):
                 QMessageBox.Yes | QMessageBox.No, QMessageBox.No) == QMessageBox.No:
             return
 
-        return name, clrs  # process handling in parent class
+        return name, PackedArt.from_rgb(self._grid.saved_colors, self.cells_num)  # process handling in parent class
 
     def setEnabled(self, value: bool) -> None:
-        for cell in self._cells():
-            cell.color = theme.CELL_DEFAULT_COLOR if value else cell.saved_color
-            cell.setEnabled(value)
+        # disabled field shows the art to be painted
+        self._grid.set_colors(0 if value else self._grid.saved_colors)
+        self._grid.setEnabled(value)
 
 
 class PixelArt(QWidget):
+    pb_changed = pyqtSignal(str, float)  # name of art and its new best time in seconds
 
     def __new__(cls, *args: P.args, **kwargs: P.kwargs) -> CustomArt | SavedArt:
         if cls == PixelArt:
             raise SystemError('Cannot create PixelArt object directly')
         return super().__new__(cls)
 
-    def __init__(self, name: str, pb: int, parent: QWidget = None) -> None:
-        global theme
-        theme = Theme(db.get_setting_value('theme'))
-
+    def __init__(self, parent: QWidget = None) -> None:
         super().__init__(parent)
 
         self.setWindowTitle('SpeedPixels')
-        self.setWindowIcon(QIcon(os.path.join(MEDIA_URL, 'general/icon.svg')))
+        self.setWindowIcon(assets.icon(os.path.join(MEDIA_URL, 'general/icon.svg')))
 
         self.setWindowFlags(Qt.FramelessWindowHint)
         self.setGeometry(*self.screen().geometry().getRect())
 
-        self._name = name
-        self._best_time = pb
+        self._name = CUSTOM
+        self._best_time = NOT_PROVIDED
+        self._saving: str | None = None  # name of art, which is being saved to be opened after that
+
+        persistence.written.connect(self._on_art_write)
+        persistence.failed.connect(self._on_art_write_fail)
 
         self._user_color = theme.CELL_DEFAULT_COLOR
 
         self.setLayout(QHBoxLayout(self))
-        self.setStyleSheet(f'background-color: {theme.ART_BACKGROUND_COLOR.name()};')
 
         # art info
-        self._art_name_label = QLabel(f'Name: {self.name if self.name != CUSTOM else NOT_PROVIDED}', self)
+        self._art_name_label = QLabel(self)
         self._best_time_label = QLabel(self)
+        self._run_stats_label = QLabel(self)
         self._current_time_label = Timer(self, 'Current time: ')
 
         # right border
         self._right_border = QVBoxLayout(self)
         self._right_border.addWidget(self._art_name_label, alignment=Qt.AlignHCenter)
         self._right_border.addWidget(self._best_time_label, alignment=Qt.AlignHCenter)
+        self._right_border.addWidget(self._run_stats_label, alignment=Qt.AlignHCenter)
         self._right_border.addWidget(self._current_time_label, alignment=Qt.AlignHCenter)
         self._right_border.addWidget(QLabel(self), alignment=Qt.AlignBottom)
-        set_text_color(self._right_border, theme.FONT_COLOR)
 
         for i in range(self._right_border.count()):
             widget = self._right_border.itemAt(i).widget()
@@ -209,7 +317,8 @@ class PixelArt(QWidget):
             widget.setMaximumWidth(self.width() * BORDER_SIZE[0] // 100)
 
         # field
-        self._field = Field(self)
+        self._field = Field(self, CELLS_NUM)
+        self._field.clicked.connect(self._on_field_click)
         self._field.filled.connect(self._on_field_fill)
 
         # action buttons
@@ -221,20 +330,19 @@ class PixelArt(QWidget):
         self._menu_btn = QPushButton('To menu', self)
         self._palette_layout = QVBoxLayout(self)
         self._palette_layout.setSpacing(25)
-        # Hooks keyboard nums from 1 to 9 press using "keyboard" module.
-        # Hook is enabled, when colors palette (not svg palette) is active. In other cases it is set to None.
-        self._keyboard_hook = None
+        # Colors palette buttons by index of number key (from 1 to 9), which selects their color.
+        # Filled, when colors palette (not svg palette) is active. In other cases it contains only None values.
+        self._palette_keys: list[QPushButton | None] = [None] * MAX_COLORS_NUM
+        self._key_latencies: deque[int] = deque(maxlen=100)  # ns from key press to selected color
 
         self._paint_btn.clicked.connect(self._paint_btn_callback)
         self._restart_btn.clicked.connect(self._restart_btn_callback)
         self._clear_btn.clicked.connect(self._clear_btn_callback)
         self._save_btn.clicked.connect(self._save_btn_callback)
         self._delete_btn.clicked.connect(self._delete_btn_callback)
-        self._menu_btn.clicked.connect(lambda: load_menu(self))
+        self._menu_btn.clicked.connect(navigator.show_menu)
 
-        for btn in (self._paint_btn, self._restart_btn, self._clear_btn,
-                    self._save_btn, self._delete_btn, self._menu_btn):
-            btn.setStyleSheet(f'background-color: {theme.ACTION_BUTTONS_BACKGROUND_COLOR.name()};')
+        for btn in self._action_buttons:
             btn.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
             btn.setMaximumWidth(self.width() * BORDER_SIZE[0] // 100)
 
@@ -249,7 +357,6 @@ class PixelArt(QWidget):
         self._left_border.addItem(self._palette_layout)
         self._left_border.addStretch()
         self._left_border.addWidget(self._menu_btn, alignment=Qt.AlignBottom)
-        set_text_color(self._left_border, theme.FONT_COLOR)
 
         # main window layout
         self.layout().addItem(self._left_border)
@@ -258,30 +365,68 @@ class PixelArt(QWidget):
 
         # media preload/usage
         self._palette_svg = QLabel(self)
-        palette_svg = QPixmap(os.path.join(MEDIA_URL, 'general/palette.svg'))
         im_size = self.width() * BORDER_SIZE[0] // 200  # 50 percents of border width
-        self._palette_svg.setPixmap(palette_svg.scaled(im_size, im_size))
+        self._palette_svg.setPixmap(assets.pixmap(PALETTE_IMAGE, (im_size, im_size)))
         self._palette_svg.setSizePolicy(QSizePolicy.Maximum, QSizePolicy.Expanding)
         self._palette_svg.mousePressEvent = self._svg_palette_callback
 
-        self._selected_icon = QIcon(os.path.join(MEDIA_URL, 'general/selected.png'))
-
-        self._countdown_frames = (
-            QPixmap(os.path.join(MEDIA_URL, 'general/gg.png')),
-            QPixmap(os.path.join(MEDIA_URL, 'general/3.png')),
-            QPixmap(os.path.join(MEDIA_URL, 'general/2.png')),
-            QPixmap(os.path.join(MEDIA_URL, 'general/1.png'))
-        )
+        self._selected_icon = assets.icon(os.path.join(MEDIA_URL, 'general/selected.png'))
 
         # countdown (Starts on paint/restart button callbacks. Clear button stops countdown)
         self._countdown = Countdown(
             self,
-            before=[lambda: self._field.setEnabled(False)],
-            after=[lambda: self._field.setEnabled(True), self._current_time_label.run]
+            before=[self._stop_run, lambda: self._field.setEnabled(False)],
+            after=[lambda: self._field.setEnabled(True), self._current_time_label.run, self._start_run]
         )
 
-        # sets start palette (as svg) to left border
-        self._switch_palette()
+        # runs of saved arts are recorded, the best one is replayed as a ghost along the current run
+        self._recorder = RunRecorder()
+        self._ghost: Ghost | None = None
+        self._ghost_timer = QTimer(self)
+        self._ghost_timer.setInterval(max(1, round(1000 / (self.screen().refreshRate() or 60))))
+        self._ghost_timer.timeout.connect(self._advance_ghost)
+
+        self.set_theme(Theme(db.get_setting_value('theme')))
+
+    @property
+    def _action_buttons(self) -> tuple[QPushButton, ...]:
+        return (self._paint_btn, self._restart_btn, self._clear_btn,
+                self._save_btn, self._delete_btn, self._menu_btn)
+
+    def set_theme(self, value: Theme) -> None:
+        global theme
+        theme = self._theme = value
+
+        self.setStyleSheet(f'background-color: {theme.ART_BACKGROUND_COLOR.name()};')
+        for btn in self._action_buttons:
+            btn.setStyleSheet(f'background-color: {theme.ACTION_BUTTONS_BACKGROUND_COLOR.name()};')
+        set_text_color(self._right_border, theme.FONT_COLOR)
+        set_text_color(self._left_border, theme.FONT_COLOR)
+        self.update()
+
+    def _load(self, name: str, pb: float | str, cells_num: tuple[int, int]) -> None:
+        # resets window state, so the same window is reused for every art of its kind
+        if db.get_setting_value('theme') != self._theme.theme:  # theme may have been switched in menu
+            self.set_theme(Theme(db.get_setting_value('theme')))
+
+        self._countdown.stop()
+        self._stop_run()
+        self._ghost = None
+        self._current_time_label.drop()
+        self._name = name
+        self._best_time = pb
+        self._art_name_label.setText(f'Name: {name if name != CUSTOM else NOT_PROVIDED}')
+        self._best_time_label.setHidden(True)
+        self._user_color = theme.CELL_DEFAULT_COLOR
+        self._field.reset(cells_num)
+        self._field.setEnabled(True)
+        self._switch_palette()  # field has no colors yet, so svg palette is set
+        self._show_run_stats()
+
+    def _show_run_stats(self) -> None:
+        stats = db.get_run_stats(self.name) if self.name != CUSTOM else None
+        self._run_stats_label.setText(stats.describe() if stats is not None else '')
+        self._run_stats_label.setHidden(stats is None)
 
     @property
     def name(self) -> str:
@@ -307,12 +452,6 @@ class PixelArt(QWidget):
             raise ValueError('Setter of property "user_color" got invalid color')
         self._user_color = color
 
-    def _is_pb(self, time: int) -> bool:
-        try:
-            return time < float(self._best_time) * 1000
-        except (ValueError, TypeError):
-            return True
-
     def _paint_btn_callback(self) -> None:
         self._field.paint()
         if not self._field.used_colors:
@@ -324,7 +463,7 @@ class PixelArt(QWidget):
 
         self._switch_palette()
         self._current_time_label.drop(save_text=True)
-        self._countdown.start(1000, *self._countdown_frames[1:])
+        self._countdown.start(1000, *COUNTDOWN_FRAMES[1:])
 
         if self.user_color not in self._field.used_colors:
             self.user_color = self._field.used_colors[0]
@@ -340,14 +479,8 @@ class PixelArt(QWidget):
         r = self._field.save()
 
         if r:
-            try:
-                self.name = r[0]
-                db.save_art_row(self.name, self._best_time, r[1])
-                art = SavedArt(self.name)
-                art.show()
-                self.close()
-            except ValueError:
-                QMessageBox.information(self, 'Error', 'Invalid data', QMessageBox.Ok, QMessageBox.Ok)
+            self.name = self._saving = r[0]
+            persistence.save(self.name, self._best_time, r[1])  # saved art is opened, when it's written
 
         if self._current_time_label.milliseconds:
             self._current_time_label.run()
@@ -357,7 +490,7 @@ class PixelArt(QWidget):
             self._clear_btn_callback()
             return
         self._current_time_label.drop(save_text=True)
-        self._countdown.start(1000, *self._countdown_frames[1:])
+        self._countdown.start(1000, *COUNTDOWN_FRAMES[1:])
 
     def _clear_btn_callback(self) -> None:
         if self._field.used_colors:
@@ -365,6 +498,7 @@ class PixelArt(QWidget):
         self._switch_palette()
         self._current_time_label.drop()
         self._countdown.stop()
+        self._stop_run()
         self._field.setEnabled(True)
         self._field.clear()
         if self.name == CUSTOM:
@@ -374,17 +508,57 @@ class PixelArt(QWidget):
     def _delete_btn_callback(self) -> None:
         if QMessageBox.question(self, 'Warning', 'Are you sure you want to delete this pixel art?',
                                 QMessageBox.Yes | QMessageBox.No, QMessageBox.No) == QMessageBox.Yes:
-            db.delete_art_row(self.name)
-            load_menu(self)
+            persistence.delete(self.name)
+            navigator.show_menu()
+
+    def _start_run(self) -> None:
+        if self.name == CUSTOM:
+            return
+        self._recorder.start(self.name, self._field.board)
+        if self._ghost is not None:
+            self._ghost.reset()
+            self._field.set_ghost(self._ghost)
+            self._ghost_timer.start()
+
+    def _stop_run(self) -> None:
+        self._recorder.cancel()
+        self._ghost_timer.stop()
+        self._field.set_ghost(None)
+
+    def _advance_ghost(self) -> None:
+        self._field.update_cells(self._ghost.advance(self._current_time_label.milliseconds))
+
+    def _on_field_click(self, index: int, rgb: int) -> None:
+        self._recorder.click(self._current_time_label.milliseconds, index, rgb)
 
     def _on_field_fill(self) -> None:
-        if self._is_pb(self._current_time_label.milliseconds):
-            self._best_time = self._current_time_label.to_str(self._current_time_label.milliseconds)
+        milliseconds = self._current_time_label.stop()  # exact time when the last cell was painted
+        pb = is_pb(milliseconds, self._best_time)
+        recording = self._recorder.finish(milliseconds, pb=pb)  # custom arts are not recorded
+        if pb:
+            if recording is not None:
+                self._ghost = Ghost(recording, self._field.board.saved_colors)
+            self._best_time = Timer.to_str(milliseconds)
             self._best_time_label.setText(f'Best time: {self._best_time}')
             if self.name != CUSTOM:  # ignores saving for custom arts
-                db.save_art_row(self.name, float(self._best_time))  # saves new pb
+                persistence.save_pb(self.name, milliseconds / 1000)  # saves new pb in background
+                self.pb_changed.emit(self.name, milliseconds / 1000)
+        if self.name != CUSTOM:
+            persistence.save_run(self.name, milliseconds / 1000, time.time_ns() // 1_000_000)
         self._current_time_label.drop(save_text=True)
-        self._countdown.start(1000, *self._countdown_frames)
+        self._countdown.start(1000, *COUNTDOWN_FRAMES)
+
+    def _on_art_write(self, name: str) -> None:
+        if name == self._saving:
+            self._saving = None
+            navigator.show_art(name)
+        elif name == self.name and self.isVisible():
+            self._show_run_stats()
+
+    def _on_art_write_fail(self, name: str, _: str) -> None:
+        if name == self._saving:
+            self._saving = None
+            QMessageBox.information(self, 'Error', 'Invalid data', QMessageBox.Ok, QMessageBox.Ok)
 
     def _mark_as_selected(self, color: QPushButton) -> None:
         for idx in range(self._palette_layout.count()):
@@ -402,6 +576,7 @@ class PixelArt(QWidget):
             self._set_colors_palette(*colors)
 
     def _clear_palette(self) -> None:
+        self._palette_keys[:] = [None] * MAX_COLORS_NUM
         for _ in range(self._palette_layout.count()):
             item = self._palette_layout.itemAt(0)
             self._palette_layout.removeItem(item)
@@ -429,14 +604,11 @@ class PixelArt(QWidget):
             lt.addWidget(lbl, alignment=Qt.AlignRight)
             lt.addWidget(btn, alignment=Qt.AlignLeft)
             self._palette_layout.addLayout(lt)
-        self._keyboard_hook = keyboard.on_press(self._hook_keyboard_press)
+            self._palette_keys[idx] = btn
 
     def _set_svg_palette(self) -> None:
         self._palette_layout.addWidget(self._palette_svg, alignment=Qt.AlignHCenter)
         self._palette_svg.setHidden(False)
-        if self._keyboard_hook:
-            keyboard.unhook(self._keyboard_hook)
-            self._keyboard_hook = None
 
     def _svg_palette_callback(self, _: QEvent) -> None:
         # do not use QColorDialog.getColor method. It is static, so background color cannot be set
@@ -445,45 +617,76 @@ class PixelArt(QWidget):
         dialog.open()
         dialog.colorSelected.connect(lambda: setattr(self, 'user_color', dialog.selectedColor()))
 
-    def _hook_keyboard_press(self, event: keyboard.KeyboardEvent) -> None:
-        if event.event_type == 'down' and event.name.isdigit():
-            try:
-                self.user_color = self._field.used_colors[int(event.name) - 1]
-                self._mark_as_selected(self._palette_layout.itemAt(int(event.name) - 1).layout().itemAt(1).widget())
-            except IndexError:
-                return  # should not change current color if index is invalid
+    @property
+    def key_latencies(self) -> tuple[float, ...]:
+        # milliseconds from number key press to selected color for the last selections
+        return tuple(ns / 1_000_000 for ns in self._key_latencies)
+
+    def keyPressEvent(self, e: QKeyEvent) -> None:
+        # number keys (main and keypad ones, both have the same key codes) select colors of colors palette
+        start = time.perf_counter_ns()
+        idx = e.key() - Qt.Key_1
+        btn = self._palette_keys[idx] if 0 <= idx < MAX_COLORS_NUM else None
+        if btn is None:
+            super().keyPressEvent(e)
+            return  # should not change current color if key is not bound to it
+
+        self.user_color = btn.backgroundColor
+        self._mark_as_selected(btn)
+        self._key_latencies.append(time.perf_counter_ns() - start)
 
     def resizeEvent(self, e: QResizeEvent) -> None:
         self._countdown.resize(e.size())
 
+    def hideEvent(self, e: QHideEvent) -> None:
+        # hidden window waits for the next art to be loaded, so nothing should keep running
+        if not e.spontaneous():
+            self._countdown.stop()
+            self._current_time_label.pause()
+            self._ghost_timer.stop()
+
 
 class ActionsCleanupMixin:
 
     @staticmethod
-    def _delete(*buttons: QPushButton) -> None:
+    def _hide(*buttons: QPushButton) -> None:
         for btn in buttons:
-            btn.deleteLater()
+            btn.hide()
 
 
 class CustomArt(PixelArt, ActionsCleanupMixin):
 
-    def __init__(self, **kwargs: str) -> None:
-        super().__init__(CUSTOM, NOT_PROVIDED, **kwargs)
+    def __init__(self, cells_num: tuple[int, int] = CELLS_NUM, **kwargs: QWidget) -> None:
+        super().__init__(**kwargs)
 
-        self._delete(self._delete_btn)
+        self._hide(self._delete_btn)
+        self.load(cells_num)
+
+    def load(self, cells_num: tuple[int, int] = CELLS_NUM) -> None:
+        self._load(CUSTOM, NOT_PROVIDED, cells_num)
 
 
 class SavedArt(PixelArt, ActionsCleanupMixin):
 
-    def __init__(self, name: str, **kwargs: str) -> None:
+    def __init__(self, name: str, **kwargs: QWidget) -> None:
+        super().__init__(**kwargs)
+
+        self._hide(self._paint_btn, self._save_btn, self._clear_btn)
+        self.load(name)
+
+    def load(self, name: str) -> None:
         row = db.get_art_row(name)
 
         if not row:
             raise NameError(f'Art with name "{name}" is not saved')
 
-        super().__init__(row[0], row[1], **kwargs)
+        self._load(row[0], row[1], row[2].cells_num)
         self._field.prepare(row[2])
         self._paint_btn_callback()
 
-        unavailable_btns = [self._paint_btn, self._save_btn, self._clear_btn]
-        self._delete(*unavailable_btns + ([self._delete_btn] if name in db.get_art_names(is_prepared=1) else []))
+        # recording of the best run is replayed only if it really fills this art in its best time
+        recording = load_pb(self.name)
+        if recording is not None and verify(recording, self._field.board.saved_colors, self._best_time):
+            self._ghost = Ghost(recording, self._field.board.saved_colors)
+
+        self._delete_btn.setHidden(bool(row[3]))  # prepared arts cannot be deleted
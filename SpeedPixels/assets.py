@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+__all__ = (
+    'AssetManager',
+    'AssetStats',
+    'assets'
+)
+
+import threading
+from collections import OrderedDict
+from typing import Iterable, NamedTuple
+
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QIcon, QImage, QPixmap
+
+Size = tuple[int, int]
+
+
+class AssetStats(NamedTuple):
+    hits: int
+    misses: int
+    pixmaps: int  # number of cached pixmaps (originals and scaled copies)
+    icons: int
+    bytes: int  # memory taken by cached pixmaps
+    prewarmed: int  # decoded (and scaled) in background and not yet turned into pixmaps
+
+
+class AssetManager:
+    """
+    Process-wide cache of decoded media files.
+    Every file is decoded once and every scaled copy is made once per requested size.
+    Least recently used pixmaps are evicted, when cached pixmaps take more than capacity bytes.
+    Paths may contain "{}" placeholder, which is replaced with the requested theme name.
+    """
+
+    def __init__(self, capacity: int = 128 * 1024 * 1024) -> None:
+        self._capacity = capacity
+        self._used = 0  # bytes taken by cached pixmaps
+        self._pixmaps: OrderedDict[tuple[str, Size | None], QPixmap] = OrderedDict()
+        self._icons: dict[str, QIcon] = {}
+        self._hits = self._misses = 0
+
+        # QPixmap may be created on GUI thread only, so background thread decodes files into QImage objects
+        self._images: dict[tuple[str, Size | None], QImage] = {}
+        self._images_lock = threading.Lock()
+
+    @staticmethod
+    def _bytes(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+    @property
+    def stats(self) -> AssetStats:
+        return AssetStats(self._hits, self._misses, len(self._pixmaps), len(self._icons), self._used,
+                          len(self._images))
+
+    def pixmap(self, path: str, size: QSize | Size = None, theme: str = None) -> QPixmap:
+        if theme is not None:
+            path = path.format(theme)
+        if isinstance(size, QSize):
+            size = (size.width(), size.height())
+
+        key = (path, size)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._hits += 1
+            self._pixmaps.move_to_end(key)
+            return pixmap
+
+        self._misses += 1
+        with self._images_lock:
+            image = self._images.pop(key, None)
+        if image is not None:
+            pixmap = QPixmap.fromImage(image)
+        elif size is not None:
+            pixmap = self.pixmap(path).scaled(*size)
+        else:
+            pixmap = QPixmap(path)
+
+        self._pixmaps[key] = pixmap
+        self._used += self._bytes(pixmap)
+        self._evict()
+        return pixmap
+
+    def icon(self, path: str, theme: str = None) -> QIcon:
+        if theme is not None:
+            path = path.format(theme)
+
+        icon = self._icons.get(path)
+        if icon is not None:
+            self._hits += 1
+            return icon
+
+        self._misses += 1
+        icon = self._icons[path] = QIcon(path)
+        return icon
+
+    def prewarm(self, paths: Iterable[str], themes: Iterable[str] = (), size: QSize | Size = None) -> threading.Thread:
+        """
+        Decodes (and scales to size if it is given) files in background thread,
+        so the following pixmap calls with the same size only convert them.
+        Paths with "{}" placeholder are decoded for every given theme.
+        """
+        if isinstance(size, QSize):
+            size = (size.width(), size.height())
+        paths, themes = tuple(paths), tuple(themes)
+        paths = [path.format(theme) for path in paths if '{}' in path for theme in themes] + \
+                [path for path in paths if '{}' not in path]
+
+        def decode() -> None:
+            for path in dict.fromkeys(paths):
+                key = (path, size)
+                if key in self._pixmaps:
+                    continue
+                image = QImage(path)
+                if image.isNull():
+                    continue
+                if size is not None:
+                    image = image.scaled(*size)  # same (fast, ignoring aspect ratio) scaling as QPixmap.scaled does
+                with self._images_lock:
+                    if key not in self._pixmaps:
+                        self._images.setdefault(key, image)
+
+        thread = threading.Thread(target=decode, name='assets-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    def _evict(self) -> None:
+        while self._used > self._capacity and len(self._pixmaps) > 1:
+            _, pixmap = self._pixmaps.popitem(last=False)
+            self._used -= self._bytes(pixmap)
+
+    def clear(self) -> None:
+        self._pixmaps.clear()
+        self._icons.clear()
+        with self._images_lock:
+            self._images.clear()
+        self._used = 0
+
+
+assets = AssetManager()
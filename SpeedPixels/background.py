@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+__all__ = (
+    'BackgroundQueue',
+)
+
+import threading
+from collections import deque
+from typing import Any, Callable
+
+Job = Any
+
+
+class BackgroundQueue:
+    """
+    Runs jobs in background thread (started by the first one), so the submitting thread never waits for disk.
+    Jobs run one by one in order they were submitted. Queue is flushed on close.
+
+    take is called with queued jobs under the lock and pops the next job to run, so owners may merge jobs,
+    which are still waiting in queue. Owners may also hold the lock to look at queued jobs before submitting.
+    """
+
+    def __init__(self, name: str, run: Callable[[Job], None],
+                 take: Callable[[deque[Job]], Job] = deque.popleft) -> None:
+        self.lock = threading.Condition()  # reentrant, so jobs may be submitted while it is held
+        self._name = name
+        self._run_job = run
+        self._take = take
+        self._jobs: deque[Job] = deque()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def submit(self, job: Job) -> None:
+        with self.lock:
+            if self._closed:
+                raise RuntimeError(f'{self._name} is closed')
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+            self._jobs.append(job)
+            self.lock.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self.lock:
+                while not self._jobs and not self._closed:
+                    self.lock.wait()
+                if not self._jobs:
+                    return
+                job = self._take(self._jobs)
+            self._run_job(job)
+
+    def close(self) -> None:  # blocks until every submitted job is done
+        with self.lock:
+            self._closed = True
+            self.lock.notify()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,803 @@
+from __future__ import annotations
+
+__all__ = (
+    'benchmark',
+    'run'
+)
+
+import argparse
+import atexit
+import gc
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from functools import partial
+from typing import Callable
+
+import numpy as np
+
+from PyQt5.QtCore import Qt, QAbstractAnimation, QEvent, QEventLoop, QT_VERSION_STR
+from PyQt5.QtGui import QColor, QTransform
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QPushButton
+
+import utils
+from assets import assets
+from constants import (CELLS_NUM, CELLS_NUM_CHOICES, MEDIA_URL, PIXELARTS_DB_TABLE_NAME,
+                       SETTINGS_DB_TABLE_NAME, Theme)
+from utils import DataBase, PackedArt, RunStats, TimeSketch
+
+# Operation may have attributes:
+# "ops" - number of operations done per call, "prepare" - function called before every call and not measured,
+# "keep" - objects, which should live as long as operation (parent widgets it does not reference itself)
+Operation = Callable[[], None]
+Result = dict[str, float | str]
+
+# benchmark name -> setup function, which prepares environment and returns operation to measure
+BENCHMARKS: dict[str, Callable[[], Operation]] = {}
+
+
+def benchmark(name: str) -> Callable[[Callable[[], Operation]], Callable[[], Operation]]:
+    def decorator(setup: Callable[[], Operation]) -> Callable[[], Operation]:
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def _measure(operation: Operation, repeat: int) -> list[int]:
+    prepare = getattr(operation, 'prepare', lambda: None)
+    samples = []
+    for _ in range(repeat):
+        prepare()
+        start = time.perf_counter_ns()
+        operation()
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def _summary(samples: list[int]) -> Result:
+    samples = sorted(samples)
+
+    def percentile(q: float) -> float:
+        return samples[min(len(samples) - 1, int(len(samples) * q))] / 1000
+
+    return {'runs': len(samples), 'mean_us': statistics.fmean(samples) / 1000,
+            'p50_us': percentile(0.5), 'p95_us': percentile(0.95), 'p99_us': percentile(0.99)}
+
+
+def _ops_summary(operation: Operation, samples: list[int]) -> Result:
+    """
+    Throughput from measured runs and allocations per operation from separate runs:
+    memory blocks left allocated by a run (gc is disabled, so cycles are counted too) and peak of traced memory.
+    """
+    ops = operation.ops
+    prepare = getattr(operation, 'prepare', lambda: None)
+
+    prepare()
+    gc.collect()
+    gc.disable()
+    try:
+        blocks = sys.getallocatedblocks()
+        operation()
+        blocks = sys.getallocatedblocks() - blocks
+    finally:
+        gc.enable()
+
+    prepare()
+    tracemalloc.start()
+    try:
+        operation()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'ops_per_sec': ops * 10 ** 9 / statistics.fmean(samples), 'blocks_per_op': blocks / ops,
+            'peak_bytes_per_op': peak / ops}
+
+
+def _report(name: str, result: Result) -> None:
+    if 'error' in result:
+        print(f'{name:<36} failed: {result["error"]}')
+        return
+    print(f'{name:<36} {result["runs"]:>6} runs   mean {result["mean_us"]:>10.1f} us   '
+          f'p50 {result["p50_us"]:>10.1f} us   p95 {result["p95_us"]:>10.1f} us   p99 {result["p99_us"]:>10.1f} us')
+    if 'ops_per_sec' in result:
+        print(f'{name:<36} {result["ops_per_sec"]:>13,.0f} ops/s   {result["blocks_per_op"]:>8.2f} blocks/op '
+              f'left allocated   {result["peak_bytes_per_op"]:>8.1f} B/op at peak')
+
+
+def run(*prefixes: str, repeat: int = 200, quiet: bool = False) -> dict[str, Result]:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if prefixes and not name.startswith(prefixes):
+            continue
+        try:
+            operation = setup()
+            getattr(operation, 'prepare', lambda: None)()
+            operation()  # warm up caches before measuring
+            samples = _measure(operation, repeat)
+            result = _summary(samples)
+            if getattr(operation, 'ops', None):
+                result.update(_ops_summary(operation, samples))
+        except Exception as exc:  # failed benchmark is reported, the other ones are still run
+            result = {'error': f'{type(exc).__name__}: {exc}'}
+        results[name] = result
+        if not quiet:
+            _report(name, result)
+    return results
+
+
+# ----------------------------------------------------------------- database
+
+def _art(cells_num: tuple[int, int], seed: int = 0) -> PackedArt:
+    # every third cell is painted with one of 8 colors
+    colors = [QColor(0x20 * i, 0x10 * i, 0xff - 0x20 * i).rgb() for i in range(1, 9)]
+    rgb = [colors[(cell + seed) % len(colors)] if cell % 3 == 0 else 0 for cell in range(cells_num[0] * cells_num[1])]
+    return PackedArt.from_rgb(rgb, cells_num)
+
+
+_temp_root: tempfile.TemporaryDirectory | None = None
+
+
+def _temp_dir() -> str:
+    # every benchmark gets its own directory inside the one of the run, which is removed at exit
+    global _temp_root
+
+    if _temp_root is None:
+        _temp_root = tempfile.TemporaryDirectory(prefix='speedpixels-bench-')
+        atexit.register(_remove_temp_root)  # runs before exit handlers of utils, which were registered on import
+    return tempfile.mkdtemp(dir=_temp_root.name)
+
+
+def _remove_temp_root() -> None:
+    # databases are written and closed first, so nothing is reopened in removed directory
+    utils.persistence.close()
+    utils.Settings.flush_all()
+    utils.ConnectionPool.close_all()
+    _temp_root.cleanup()
+
+
+def _temp_db(prepared: int = 8, custom: int = 1000) -> DataBase:
+    url = os.path.join(_temp_dir(), 'db.sqlite3')
+    db = DataBase(url=url)
+
+    for idx in range(prepared + custom):
+        db.save_art_row(f'art {idx}', float(idx), _art(CELLS_NUM, idx))
+    db._cursor.execute(f'UPDATE {PIXELARTS_DB_TABLE_NAME} SET is_prepared = 1 WHERE id <= ?', (prepared,))
+
+    return db
+
+
+@benchmark('db.query.fresh_connection')
+def _bench_query_fresh_connection() -> Operation:
+    url = _temp_db()._pool.url
+
+    def operation() -> None:  # how every query was run before connections were pooled
+        connection = sqlite3.connect(url)
+        connection.execute(f'SELECT time FROM {PIXELARTS_DB_TABLE_NAME} WHERE name = ?', ('art 0',)).fetchone()
+        connection.close()
+
+    return operation
+
+
+@benchmark('db.query.pooled')
+def _bench_query_pooled() -> Operation:
+    db = _temp_db()
+    return lambda: db._cursor.execute(f'SELECT time FROM {PIXELARTS_DB_TABLE_NAME} WHERE name = ?',
+                                      ('art 0',)).fetchone()
+
+
+@benchmark('db.menu_load.art_rows')
+def _bench_menu_load_art_rows() -> Operation:
+    db = _temp_db()
+    # how menu got best times before summaries: one query for names and one full art row per preview
+    return lambda: [db.get_art_row(name)[1] for name in db.get_art_names(is_prepared=1)]
+
+
+@benchmark('db.menu_load.summaries')
+def _bench_menu_load_summaries() -> Operation:
+    db = _temp_db()
+    return lambda: [summary.time for summary in db.get_art_summaries(is_prepared=1)]
+
+
+@benchmark('db.user_arts_page.offset')
+def _bench_user_arts_page_offset() -> Operation:
+    db = _temp_db(custom=20000)
+    return lambda: db.get_art_names(limit=50, offset=19900, is_prepared=0)  # one of the last pages
+
+
+@benchmark('db.user_arts_page.keyset')
+def _bench_user_arts_page_keyset() -> Operation:
+    db = _temp_db(custom=20000)
+    return lambda: db.get_art_summaries(limit=50, after_id=19900, is_prepared=0)
+
+
+@benchmark('db.pb_save')
+def _bench_pb_save() -> Operation:
+    db = _temp_db()
+    times = iter(range(10 ** 9))
+    return lambda: db.save_art_row('art 0', float(next(times)))
+
+
+@benchmark('db.pb_save.queued')
+def _bench_pb_save_queued() -> Operation:
+    from utils import Persistence
+
+    persistence = Persistence(url=_temp_db().url)
+    times = iter(range(10 ** 9))
+    return lambda: persistence.save_pb('art 0', float(next(times)))  # what GUI thread waits for now
+
+
+@benchmark('db.settings.get.query')
+def _bench_settings_get_query() -> Operation:
+    db = _temp_db(prepared=0, custom=0)
+    # how every setting was read before settings were kept in memory
+    return lambda: [row for row in db._cursor.execute(f'SELECT * FROM {SETTINGS_DB_TABLE_NAME}').fetchall()
+                    if row[0].lower() == 'theme']
+
+
+@benchmark('db.settings.get.cached')
+def _bench_settings_get_cached() -> Operation:
+    db = _temp_db(prepared=0, custom=0)
+    return lambda: db.get_setting_value('theme')
+
+
+def _runs_db(runs: int = 1_000_000) -> DataBase:
+    # the first art has a long history of runs, which is inserted at once with aggregates add_run would have made
+    db = _temp_db(prepared=8, custom=0)
+    rng = random.Random(0)
+    times = [rng.uniform(5, 60) for _ in range(runs - 1)]
+    sketch = TimeSketch()
+    for run_time in times:
+        sketch.add(run_time)
+    with db._transaction() as cursor:
+        cursor.executemany('INSERT INTO Runs (art_id, finished_at, time) VALUES (1, ?, ?)', enumerate(times))
+        cursor.execute('INSERT INTO RunStats (art_id, count, best, mean, median, last, sketch) '
+                       'VALUES (1, ?, ?, ?, ?, ?, ?)',
+                       (len(times), min(times), statistics.fmean(times), sketch.quantile(0.5),
+                        array('d', reversed(times[-RunStats.LAST_NUM:])).tobytes(), sketch.to_bytes()))
+    db.add_run('art 0', 10.0, runs)
+    return db
+
+
+@benchmark('db.runs.add.1m')
+def _bench_runs_add() -> Operation:
+    db = _runs_db()
+    finished_at = iter(range(10 ** 7, 10 ** 9))
+    return lambda: db.add_run('art 0', 12.5, next(finished_at))  # what persistence does after every finished run
+
+
+@benchmark('db.runs.stats.1m')
+def _bench_runs_stats() -> Operation:
+    db = _runs_db()
+    return lambda: db.get_run_stats('art 0')  # last 10, median and best without scanning runs
+
+
+def _bench_art_load(cells_num: tuple[int, int]) -> Operation:
+    db = _temp_db(prepared=0, custom=0)
+    db.save_art_row('art', 1.0, _art(cells_num))
+    return lambda: db.get_art_row('art')[2].to_rgb()  # fetched and decoded the way Field.prepare does
+
+
+def _bench_art_save(cells_num: tuple[int, int]) -> Operation:
+    db = _temp_db(prepared=0, custom=0)
+    art = _art(cells_num)
+    return lambda: db.save_art_row('art', 1.0, art)
+
+
+for _cells_num in CELLS_NUM_CHOICES:
+    benchmark('db.art_load.%dx%d' % _cells_num)(partial(_bench_art_load, _cells_num))
+    benchmark('db.art_save.%dx%d' % _cells_num)(partial(_bench_art_save, _cells_num))
+
+
+# -------------------------------------------------------------------- board
+
+def _bench_click_stream(cells_num: tuple[int, int], clicks: int = 1000) -> Operation:
+    from board import BoardState
+
+    board = BoardState(cells_num)
+    board.set_saved_colors(_art(cells_num).to_rgb())
+    # seeded stream of clicks with saved colors and some wrong ones, as a player clicking around the field
+    palette = board.palette + (QColor(1, 2, 3).rgb(),)
+    rng = random.Random(0)
+    stream = [(rng.randrange(len(board)), rng.choice(palette)) for _ in range(clicks)]
+
+    def operation() -> None:
+        click = board.click
+        for index, rgb in stream:
+            click(index, rgb)
+
+    operation.ops = clicks
+    return operation
+
+
+for _cells_num in CELLS_NUM_CHOICES:
+    benchmark('board.click_stream.%dx%d' % _cells_num)(partial(_bench_click_stream, _cells_num))
+
+
+def _recording(cells_num: tuple[int, int]) -> tuple[bytes, array]:
+    # finished run of a bench art: misclicks on empty cells, saved cells in random order, then misclicks erased
+    from board import BoardState
+    from recording import Recording
+
+    board = BoardState(cells_num)
+    board.set_saved_colors(_art(cells_num).to_rgb())
+    numbers = {rgb: number for number, rgb in enumerate(board.palette, 1)}
+    rng = random.Random(0)
+    cells = [index for index, rgb in enumerate(board.saved_colors) if rgb]
+    rng.shuffle(cells)
+    misclicks = [index for index, rgb in enumerate(board.saved_colors) if not rgb][:len(cells) // 10]
+
+    clicks = [*((index, 1) for index in misclicks), *((index, numbers[board.saved_colors[index]]) for index in cells),
+              *((index, 1) for index in misclicks)]
+    events = [value for index, number in clicks for value in (rng.randrange(50, 400), index, number)]
+    return Recording('art', cells_num, board.palette, events, sum(events[::3]) + 1).encode(), board.saved_colors
+
+
+def _bench_verify(cells_num: tuple[int, int]) -> Operation:
+    from board import BoardState
+    from recording import Recording, verify
+
+    data, saved_colors = _recording(cells_num)
+    best_time = Recording.decode(data).time / 1000
+    board = BoardState(cells_num)
+
+    def operation() -> None:  # offline check of a recorded best run: decoded and replayed headless
+        if not verify(Recording.decode(data), saved_colors, best_time, board):
+            raise AssertionError('Bench recording does not fill its art')
+
+    operation.ops = 1
+    return operation
+
+
+for _cells_num in CELLS_NUM_CHOICES[:3]:
+    benchmark('recording.verify.%dx%d' % _cells_num)(partial(_bench_verify, _cells_num))
+
+
+@benchmark('recording.click')
+def _bench_recording_click() -> Operation:
+    import recording
+    from board import BoardState
+
+    recording.RUNS_URL = _temp_dir()
+    board = BoardState(CELLS_NUM)
+    board.set_saved_colors(_art(CELLS_NUM).to_rgb())
+    writer = recording.RunWriter()
+    atexit.register(writer.close)  # before run files are removed
+    recorder = recording.RunRecorder(writer)
+    recorder.start('art', board)
+    clicks = iter(range(10 ** 9))
+
+    def operation() -> None:  # what a click costs to GUI thread, file is written in background
+        click = next(clicks)
+        recorder.click(click * 150, click % len(board), board.palette[click % len(board.palette)])
+
+    return operation
+
+
+# ----------------------------------------------------------------- importer
+
+def _photo() -> np.ndarray:
+    # full HD image with gradients and noise, as photos have
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:1080, 0:1920]
+    pixels = np.stack((x * 255 // 1920, y * 255 // 1080, (x + y) * 255 // 3000, np.full_like(x, 255)), axis=2)
+    pixels[..., :3] += rng.integers(0, 16, (1080, 1920, 3))
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+
+def _bench_downsample(cells_num: tuple[int, int]) -> Operation:
+    from importer import downsample
+
+    pixels = _photo()
+    return lambda: downsample(pixels, cells_num)
+
+
+def _bench_quantize(cells_num: tuple[int, int]) -> Operation:
+    from importer import downsample, quantize
+
+    cells = downsample(_photo(), cells_num)
+    return lambda: quantize(cells)
+
+
+for _cells_num in CELLS_NUM_CHOICES:
+    benchmark('importer.downsample.%dx%d' % _cells_num)(partial(_bench_downsample, _cells_num))
+    benchmark('importer.quantize.%dx%d' % _cells_num)(partial(_bench_quantize, _cells_num))
+
+
+# ----------------------------------------------------------------------- qt
+
+_app = None
+
+
+def _qt_app(db_url: str = None) -> QApplication:
+    """Creates application on offscreen platform and points modules' databases to a temporary one"""
+    global _app
+
+    if _app is None:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        _app = QApplication(sys.argv[:1])
+        utils.DB_URL = db_url or _temp_db()._pool.url  # modules create their DataBase objects on import
+
+    return _app
+
+
+def _custom_art(cells_num: tuple[int, int]) -> QWidget:
+    _qt_app()
+    from arts import CustomArt
+
+    art = CustomArt(cells_num=cells_num)
+    art.show()
+    art.user_color = QColor(200, 30, 30)
+    QApplication.processEvents()
+    return art
+
+
+def _bench_field_click(cells_num: tuple[int, int]) -> Operation:
+    grid = _custom_art(cells_num)._field._grid
+    positions = iter(range(10 ** 9))
+
+    def operation() -> None:  # press and release on a cell, then process the repaint it caused
+        pos = grid.cell_rect(next(positions) * 7 % len(grid)).center()
+        QTest.mouseClick(grid, Qt.LeftButton, pos=pos)
+        QApplication.processEvents()
+
+    return operation
+
+
+def _bench_field_repaint(cells_num: tuple[int, int]) -> Operation:
+    field = _custom_art(cells_num)._field
+    field.prepare(_art(cells_num))
+    field.paint()
+    return field._grid.repaint  # whole field with saved colors
+
+
+for _cells_num in CELLS_NUM_CHOICES:
+    benchmark('field.click.%dx%d' % _cells_num)(partial(_bench_field_click, _cells_num))
+    benchmark('field.repaint.%dx%d' % _cells_num)(partial(_bench_field_repaint, _cells_num))
+
+
+@benchmark('navigation.saved_art.rebuild')
+def _bench_saved_art_rebuild() -> Operation:
+    _qt_app()
+    from arts import SavedArt
+
+    def operation() -> None:  # how every opening of an art from menu worked before windows were reused
+        art = SavedArt('art 0')
+        art.show()
+        QApplication.processEvents()
+        art.hide()
+        art.deleteLater()
+
+    return operation
+
+
+@benchmark('navigation.saved_art.reload')
+def _bench_saved_art_reload() -> Operation:
+    _qt_app()
+    from arts import SavedArt
+
+    art = SavedArt('art 0')
+    names = iter(range(10 ** 9))
+
+    def operation() -> None:
+        art.load(f'art {next(names) % 2}')
+        art.show()
+        QApplication.processEvents()
+        art.hide()
+        QApplication.sendPostedEvents(None, QEvent.DeferredDelete)  # replaced palette widgets, as event loop does
+
+    return operation
+
+
+# ------------------------------------------------------------ input latency
+# From input sent by QTest until application reacted to it and repainted
+
+def _saved_art(name: str = 'art 0') -> QWidget:
+    # saved art ready to be painted, as if countdown was over
+    _qt_app()
+    from arts import SavedArt
+
+    art = SavedArt(name)
+    art.show()
+    art._countdown.stop()
+    art._field._grid.setEnabled(True)
+    art._field._grid.board.set_colors(0)
+    QApplication.processEvents()
+    return art
+
+
+def _bench_click_repaint(saved: bool) -> Operation:
+    art = _saved_art() if saved else _custom_art(CELLS_NUM)
+    grid = art._field._grid
+    if saved:
+        art.user_color = QColor.fromRgb(grid.saved_colors[0])  # the first cell of every bench art is saved
+    pos = grid.cell_rect(0).center()
+
+    def operation() -> None:  # cell is painted and erased in turn
+        QTest.mouseClick(grid, Qt.LeftButton, pos=pos)
+        QApplication.processEvents()
+
+    return operation
+
+
+benchmark('latency.click.saved_art')(partial(_bench_click_repaint, True))
+benchmark('latency.click.custom_art')(partial(_bench_click_repaint, False))
+
+
+@benchmark('latency.click.fill')
+def _bench_click_fill() -> Operation:
+    art = _saved_art()
+    grid = art._field._grid
+    art.user_color = QColor.fromRgb(grid.saved_colors[0])
+    pos = grid.cell_rect(0).center()
+
+    def prepare() -> None:  # every saved cell but the first one is painted
+        art._countdown.stop()
+        grid.setEnabled(True)
+        grid.board.set_colors(grid.saved_colors)
+        grid.board.set_color(0, 0)
+
+    def operation() -> None:  # the last cell click until filled signal started countdown and field is repainted
+        QTest.mouseClick(grid, Qt.LeftButton, pos=pos)
+        QApplication.processEvents()
+
+    operation.prepare = prepare
+    return operation
+
+
+@benchmark('latency.palette.key')
+def _bench_palette_key() -> Operation:
+    art = _saved_art()  # 8 colors in palette
+    keys = iter(range(10 ** 9))
+
+    def operation() -> None:  # key press to repainted selection
+        QTest.keyClick(art, Qt.Key_1 + next(keys) % 8)
+        QApplication.processEvents()
+
+    return operation
+
+
+def _bench_navigation(to_art: bool) -> Operation:
+    _qt_app()
+    navigator = utils.Navigator()
+    names = iter(range(10 ** 9))
+
+    def show_art() -> None:  # as on preview click
+        navigator.show_art(f'art {next(names) % 2}')
+        QApplication.processEvents()
+
+    def show_menu() -> None:  # as on "To menu" button click
+        navigator.show_menu()
+        QApplication.processEvents()
+
+    operation = show_art if to_art else show_menu
+    operation.prepare = show_menu if to_art else show_art
+    return operation
+
+
+benchmark('latency.navigation.menu_to_art')(partial(_bench_navigation, True))
+benchmark('latency.navigation.art_to_menu')(partial(_bench_navigation, False))
+
+
+@benchmark('latency.theme.switch')
+def _bench_theme_switch() -> Operation:
+    _qt_app()
+    from menu import Menu
+
+    menu = Menu()
+    menu.show()
+    QApplication.processEvents()
+
+    def prepare() -> None:
+        menu._theme_switcher._is_signal_emitted = False
+
+    def operation() -> None:  # switcher animation frame, which switches theme, until menu is repainted
+        switcher = menu._theme_switcher
+        switcher._rotate(switcher._animation.endValue() // 2 + 1)
+        QApplication.processEvents()
+
+    operation.prepare = prepare
+    return operation
+
+
+def _bench_menu_startup(stage: str) -> Operation:
+    _qt_app()
+    from menu import Menu
+    from utils import StartupProfiler
+
+    def operation() -> None:  # menu construction until stage is reached (imports are done once by warm up)
+        profiler = StartupProfiler()
+        menu = Menu()
+        menu.loaded.connect(lambda: profiler.mark('menu loaded'))
+        profiler.watch_first_paint(menu)
+        menu.show()
+        while stage not in profiler.stages:
+            QApplication.processEvents(QEventLoop.WaitForMoreEvents)
+        menu.hide()
+        menu.deleteLater()
+
+    return operation
+
+
+benchmark('startup.first_paint')(partial(_bench_menu_startup, 'first paint'))
+benchmark('startup.menu_loaded')(partial(_bench_menu_startup, 'menu loaded'))
+
+
+@benchmark('menu.theme_switch')
+def _bench_menu_theme_switch() -> Operation:
+    _qt_app()
+    from menu import Menu
+
+    menu = Menu()
+    menu.show()
+    themes = iter(range(10 ** 9))
+
+    def operation() -> None:  # what happens in the middle of switcher animation
+        menu._on_theme_switch(Theme(('dark', 'light')[next(themes) % 2]))
+        QApplication.processEvents()
+
+    return operation
+
+
+def _theme_switcher() -> tuple[QWidget, QWidget]:
+    # parent is returned too, as switcher is deleted together with it
+    _qt_app()
+    from menu import ThemeSwitcher
+
+    parent = QWidget()
+    parent.resize(1920, 1080)
+    switcher = ThemeSwitcher(parent)
+    parent.show()
+    QApplication.processEvents()
+    return parent, switcher
+
+
+@benchmark('theme_switcher.frame.transformed')
+def _bench_theme_switcher_frame_transformed() -> Operation:
+    parent, switcher = _theme_switcher()
+    label = QLabel(parent)
+    label.show()
+    angles = iter(range(10 ** 9))
+
+    def operation() -> None:  # how every frame was made before: a new rotated pixmap set to label
+        label.setPixmap(switcher._pixmap.transformed(QTransform().rotate(next(angles) % 180)))
+        label.repaint()
+
+    operation.keep = parent
+    return operation
+
+
+@benchmark('theme_switcher.frame.painter')
+def _bench_theme_switcher_frame_painter() -> Operation:
+    parent, switcher = _theme_switcher()
+    angles = iter(range(10 ** 9))
+
+    def operation() -> None:
+        switcher._value = next(angles) % 180
+        switcher.repaint()
+
+    operation.keep = parent
+    return operation
+
+
+@benchmark('menu.theme_switcher.frame_interval')
+def _bench_menu_theme_switcher_frame_interval() -> Operation:
+    _qt_app()
+    from menu import Menu
+
+    menu = Menu()
+    menu.show()
+
+    def operation() -> None:  # time between animation frames, menu theme is switched in the middle of animation
+        switcher = menu._theme_switcher  # menu is referenced, so it is not collected while switcher is animated
+        if switcher._animation.state() != QAbstractAnimation.Running:
+            switcher._animate()
+        frames = len(switcher.frame_times)
+        while len(switcher.frame_times) == frames and switcher._animation.state() == QAbstractAnimation.Running:
+            QApplication.processEvents(QEventLoop.WaitForMoreEvents)
+
+    return operation
+
+
+def _legacy_update_stylesheet(obj: QWidget, styles: str) -> None:
+    # update_stylesheet before styles were cached: reparse and reset the whole stylesheet on every call
+    dct = {}
+    for style in filter(lambda x: x, f'{obj.styleSheet()} {styles}'.strip().split(';')):
+        k, v = map(str.strip, style.split(':'))
+        dct[k] = v
+    obj.setStyleSheet('; '.join(map(lambda item: ': '.join(item), dct.items())) + ';')
+
+
+def _bench_stylesheet(widget_type: type[QWidget], style: str, update: Callable[[QWidget, str], None],
+                      colors_num: int = 2) -> Operation:
+    _qt_app()
+    window = QWidget()  # every styled widget of the application is inside a window with a stylesheet
+    window.setStyleSheet('background-color: #545454;')
+    widget = widget_type(window)
+    if widget_type is QPushButton:
+        widget.setStyleSheet('padding: 4px;')
+    window.show()
+    colors = iter(range(10 ** 9))
+
+    def operation() -> None:  # color changes on every call (as on theme switches) or is the same (as on hovers)
+        update(widget, f'{style}: #{next(colors) % colors_num * 0xffffff:06x};')
+        QApplication.processEvents()
+
+    operation.keep = window
+    return operation
+
+
+# changed label text color is set through palette, button background has to be restyled, unless it is the same
+for _type, _style, _colors_num, _suffix in ((QLabel, 'color', 2, ''), (QPushButton, 'background-color', 1, '.same')):
+    _name = f'style.{_type.__name__}.{_style}{_suffix}'
+    benchmark(f'{_name}.legacy')(partial(_bench_stylesheet, _type, _style, _legacy_update_stylesheet, _colors_num))
+    benchmark(f'{_name}.cached')(partial(_bench_stylesheet, _type, _style, utils.update_stylesheet, _colors_num))
+
+
+@benchmark('style.art.text_color')
+def _bench_art_text_color() -> Operation:
+    art = _saved_art()
+    colors = (Theme('dark').FONT_COLOR, Theme('light').FONT_COLOR)
+    themes = iter(range(10 ** 9))
+
+    def operation() -> None:  # labels of both art borders, as on theme switch
+        color = colors[next(themes) % 2]
+        utils.set_text_color(art._right_border, color)
+        utils.set_text_color(art._left_border, color)
+        QApplication.processEvents()
+
+    return operation
+
+
+def _bench_preview_image(cached: bool) -> Operation:
+    _qt_app()
+    from assets import AssetManager
+
+    manager = AssetManager()
+    path = os.path.join(MEDIA_URL, '{}/Avocado_preview_img.png')
+    themes = iter(range(10 ** 9))
+
+    def operation() -> None:  # preview image for both themes, as on menu loading and theme switching
+        if not cached:
+            manager.clear()
+        manager.pixmap(path, (300, 200), ('dark', 'light')[next(themes) % 2])
+
+    return operation
+
+
+benchmark('assets.preview_image.decode')(partial(_bench_preview_image, False))
+benchmark('assets.preview_image.cached')(partial(_bench_preview_image, True))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Runs SpeedPixels benchmarks')
+    parser.add_argument('prefixes', nargs='*', help='run only benchmarks which names start with given prefixes')
+    parser.add_argument('--repeat', type=int, default=200, help='number of measured runs per benchmark')
+    parser.add_argument('--json', metavar='PATH', help='write results as JSON to the file ("-" for stdout)')
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    results = run(*args.prefixes, repeat=args.repeat, quiet=args.json == '-')
+    if args.json:
+        # environment is recorded, so results of different releases are compared on the same ground
+        report = {'python': platform.python_version(), 'qt': QT_VERSION_STR, 'platform': platform.platform(),
+                  'qpa': os.environ.get('QT_QPA_PLATFORM'), 'repeat': args.repeat, 'results': results,
+                  'assets': assets.stats._asdict()}  # state of the shared media cache after benchmarks
+        if args.json == '-':
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, 'w') as file:
+                json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+__all__ = (
+    'BoardState',
+    'Click',
+    'is_pb'
+)
+
+from array import array
+from collections import Counter
+from enum import IntEnum
+from operator import ne
+
+from constants import CELLS_NUM, MAX_COLORS_NUM
+
+
+class Click(IntEnum):
+    IGNORED = 0  # nothing changed (cell of another saved color or painting with empty color)
+    PAINTED = 1
+    ERASED = 2
+    FILLED = 3  # cell was changed and the art is completed
+    OVERFLOW = 4  # painting would exceed the colors limit, so it was reverted
+
+
+class BoardState:
+    """
+    Game rules of a field, which do not need Qt widgets (or Qt application) to run.
+    Cells are kept in flat arrays of QRgb values (index is row * columns + column), 0 stands for empty cell.
+
+    Arrays should only be changed through methods, which keep running counters up to date:
+    number of cells not matching saved ones and number of cells painted with every color.
+    So clicks, completion and colors limit checks do not depend on number of cells.
+    """
+
+    def __init__(self, cells_num: tuple[int, int] = CELLS_NUM, max_colors: int = MAX_COLORS_NUM) -> None:
+        self.max_colors = max_colors
+        self.colors = array('I')  # currently painted colors
+        self.saved_colors = array('I')  # colors of the art to be painted
+        self.mismatched = 0  # number of cells, which color differs from saved one
+        self.saved_num = 0  # number of cells with saved colors
+        self.histogram: dict[int, int] = {}  # painted color -> number of cells painted with it
+        self._palette: tuple[int, ...] | None = None  # cached, invalidated when saved colors change
+        self.resize(cells_num)
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    @property
+    def cells_num(self) -> tuple[int, int]:
+        return self._columns, self._rows
+
+    def resize(self, cells_num: tuple[int, int]) -> None:  # empties the board
+        self._columns, self._rows = cells_num
+        self.colors = array('I', [0]) * (self._columns * self._rows)
+        self.saved_colors = array('I', [0]) * (self._columns * self._rows)
+        self._palette = None
+        self._recount()
+
+    @property
+    def palette(self) -> tuple[int, ...]:
+        # saved colors in order of their first appearance
+        if self._palette is None:
+            self._palette = tuple(rgb for rgb in dict.fromkeys(self.saved_colors) if rgb)
+        return self._palette
+
+    @property
+    def is_saved(self) -> bool:
+        return bool(self.saved_num)
+
+    @property
+    def is_filled(self) -> bool:
+        return self.is_saved and not self.mismatched
+
+    def set_color(self, index: int, rgb: int) -> bool:  # returns whether the cell was changed
+        previous, saved = self.colors[index], self.saved_colors[index]
+        if previous == rgb:
+            return False
+
+        self.colors[index] = rgb
+        self.mismatched += (rgb != saved) - (previous != saved)
+        if previous:
+            self.histogram[previous] -= 1
+            if not self.histogram[previous]:
+                del self.histogram[previous]
+        if rgb:
+            self.histogram[rgb] = self.histogram.get(rgb, 0) + 1
+        return True
+
+    def set_colors(self, values: array | int) -> None:  # int value is set to every cell
+        self.colors[:] = values if isinstance(values, array) else array('I', [values]) * len(self)
+        self._recount()
+
+    def set_saved_colors(self, values: array | int) -> None:  # int value is set to every cell
+        self.saved_colors[:] = values if isinstance(values, array) else array('I', [values]) * len(self)
+        self._palette = None
+        self._recount()
+
+    def click(self, index: int, rgb: int) -> Click:
+        # painted cell is erased, empty one is painted with the given color unless another color is saved in it
+        previous = self.colors[index]
+        if previous:
+            self.set_color(index, 0)
+            result = Click.ERASED
+        else:
+            saved = self.saved_colors[index]
+            if saved and rgb != saved or not self.set_color(index, rgb):
+                return Click.IGNORED
+            result = Click.PAINTED
+
+        if self.is_filled:
+            return Click.FILLED
+        if len(self.histogram) > self.max_colors:
+            self.set_color(index, previous)
+            return Click.OVERFLOW
+        return result
+
+    def paint(self) -> None:  # painted colors become the art to be painted
+        self.set_saved_colors(self.colors)
+        self.set_colors(0)
+
+    def clear(self) -> None:
+        self.set_saved_colors(0)
+        self.set_colors(0)
+
+    def _recount(self) -> None:
+        # full recount is only needed when the whole board is changed at once
+        self.mismatched = sum(map(ne, self.colors, self.saved_colors))
+        self.saved_num = len(self.saved_colors) - self.saved_colors.count(0)
+        self.histogram = Counter(self.colors)
+        self.histogram.pop(0, None)
+
+
+def is_pb(milliseconds: int, best_time: float | str) -> bool:  # best time is in seconds, NOT_PROVIDED if not set
+    try:
+        return milliseconds < float(best_time) * 1000
+    except (ValueError, TypeError):
+        return True
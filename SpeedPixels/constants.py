@@ -3,31 +3,44 @@ from __future__ import annotations
 __all__ = (
     'DB_URL',
     'MEDIA_URL',
+    'RUNS_URL',
     'PIXELARTS_DB_TABLE_NAME',
     'SETTINGS_DB_TABLE_NAME',
+    'SETTINGS',
     'CELLS_NUM',
+    'CELLS_NUM_CHOICES',
+    'MAX_CELLS_NUM',
+    'MAX_COLORS_NUM',
     'FIELD_SIZE',
     'BORDER_SIZE',
     'CUSTOM',
     'NOT_PROVIDED',
     'PREVIEWS_NUM_PER_ROW',
+    'COUNTDOWN_FRAMES',
+    'PALETTE_IMAGE',
+    'PIXEL_ART_MEDIA',
     'Theme'
 )
 
 import os
 from pathlib import Path
 
-from PyQt5.QtGui import QColor
-
 BASE_DIR = Path(__file__).parent.parent
 
 DB_URL = os.path.join(BASE_DIR, 'db.sqlite3')
 MEDIA_URL = os.path.join(BASE_DIR, 'media')
+RUNS_URL = os.path.join(BASE_DIR, 'runs')  # recordings of art runs
 
 PIXELARTS_DB_TABLE_NAME = 'ArtsInfo'
 SETTINGS_DB_TABLE_NAME = 'Settings'
+SETTINGS = {  # setting -> default value (values are stored as text, they are parsed to the type of default value)
+    'theme': 'dark',
+}
 
-CELLS_NUM = (12, 12)  # horizontal, vertical
+CELLS_NUM = (12, 12)  # horizontal, vertical (default for new arts, every art stores it's own size)
+CELLS_NUM_CHOICES = ((12, 12), (32, 32), (64, 64), (128, 128), (256, 256))
+MAX_CELLS_NUM = (256, 256)
+MAX_COLORS_NUM = 9  # maximum number of different colors in a single art
 FIELD_SIZE = (60, 100)  # horizontal, vertical (in percents)
 BORDER_SIZE = ((100 - FIELD_SIZE[0]) // 2, FIELD_SIZE[1])  # horizontal, vertical (in percents)
 
@@ -36,10 +49,16 @@ NOT_PROVIDED = '-'
 
 PREVIEWS_NUM_PER_ROW = 4
 
+COUNTDOWN_FRAMES = tuple(os.path.join(MEDIA_URL, f'general/{frame}.png') for frame in ('gg', '3', '2', '1'))
+PALETTE_IMAGE = os.path.join(MEDIA_URL, 'general/palette.svg')
+PIXEL_ART_MEDIA = (PALETTE_IMAGE, *COUNTDOWN_FRAMES)  # images, which may be decoded before art window is opened
+
 
 class Theme:
 
     def __init__(self, theme: str) -> None:
+        from PyQt5.QtGui import QColor  # imported here, so game rules using the other constants run without Qt
+
         if theme == 'light':
             self.FONT_COLOR = QColor(0, 0, 0)
             self.ART_BACKGROUND_COLOR = QColor(255, 248, 248)
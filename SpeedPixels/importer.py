@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+__all__ = (
+    'convert',
+    'downsample',
+    'import_directory',
+    'import_image',
+    'load_image',
+    'quantize'
+)
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Sequence
+
+import numpy as np
+
+from PyQt5.QtGui import QImage
+
+from constants import CELLS_NUM, CELLS_NUM_CHOICES, CUSTOM, MAX_COLORS_NUM, NOT_PROVIDED
+from utils import DataBase, PackedArt
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg')
+SAME_COLOR_RANGE = 24  # colors of a box, which channels differ less, are considered the same one (noise, artifacts)
+
+
+def load_image(path: str) -> np.ndarray:
+    # (height, width, 4) RGBA pixels, decoded by Qt, so formats are the same as application supports
+    image = QImage(path)
+    if image.isNull():
+        raise ValueError(f'Could not read image "{path}"')
+    image = image.convertToFormat(QImage.Format_RGBA8888)  # byte order does not depend on platform endianness
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, np.uint8).reshape(image.height(), image.bytesPerLine())  # lines may be padded
+    return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4).copy()
+
+
+def downsample(pixels: np.ndarray, cells_num: tuple[int, int] = CELLS_NUM) -> np.ndarray:
+    """
+    Averages blocks of pixels covered by every cell, returns (rows, columns, 4) RGBA float array.
+    Colors are weighted by alpha, so transparent pixels do not darken colors on edges.
+    """
+    columns, rows = cells_num
+    height, width = pixels.shape[:2]
+    if height < rows or width < columns:  # every cell should cover a pixel at least, so pixels are repeated
+        pixels = pixels[np.arange(max(height, rows)) * height // max(height, rows)]
+        pixels = pixels[:, np.arange(max(width, columns)) * width // max(width, columns)]
+        height, width = pixels.shape[:2]
+
+    weighted = pixels.astype(np.uint16)  # 255 * 255 fits
+    weighted[..., :3] *= weighted[..., 3:]
+    # blocks differ by a pixel at most, if image size is not divisible by field size
+    row_starts, column_starts = np.arange(rows) * height // rows, np.arange(columns) * width // columns
+    sums = np.add.reduceat(np.add.reduceat(weighted, row_starts, axis=0, dtype=np.uint64), column_starts, axis=1)
+    areas = np.outer(np.diff(row_starts, append=height), np.diff(column_starts, append=width))
+
+    alpha = sums[..., 3:].astype(np.float64)
+    return np.concatenate((sums[..., :3] / np.maximum(alpha, 1), alpha / areas[..., None]), axis=2)
+
+
+def _nearest(samples: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    return ((samples[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+
+
+def _median_cut(samples: np.ndarray, max_colors: int) -> np.ndarray:
+    # box with the widest channel range is split at its median, until there are enough boxes or nothing to split
+    boxes = [samples]
+    while len(boxes) < max_colors:
+        ranges = [np.ptp(box, axis=0).max() for box in boxes]
+        widest = int(np.argmax(ranges))
+        if ranges[widest] < SAME_COLOR_RANGE:
+            break
+        box = boxes.pop(widest)
+        order = box[:, np.ptp(box, axis=0).argmax()].argsort(kind='stable')
+        boxes += [box[order[:len(box) // 2]], box[order[len(box) // 2:]]]
+    return np.array([box.mean(axis=0) for box in boxes])
+
+
+def _merge_same(centers: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    # centers, which look the same, are merged into their weighted mean (players should tell palette colors apart)
+    merged, weights = [], []
+    for center, count in sorted(zip(centers, counts), key=lambda pair: -pair[1]):
+        for idx, kept in enumerate(merged):
+            if np.abs(kept - center).max() < SAME_COLOR_RANGE:
+                merged[idx] = (kept * weights[idx] + center * count) / (weights[idx] + count)
+                weights[idx] += count
+                break
+        else:
+            merged.append(center)
+            weights.append(count)
+    return np.array(merged)
+
+
+def quantize(cells: np.ndarray, max_colors: int = MAX_COLORS_NUM,
+             iterations: int = 10) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduces colors of downsampled cells to max_colors at most: median cut palette is refined by k-means.
+    Returns (colors, 3) uint8 palette and (rows, columns) palette indices, -1 for (mostly) transparent cells.
+    """
+    opaque = cells[..., 3] >= 128
+    samples = cells[opaque][:, :3]
+    indices = np.full(cells.shape[:2], -1, dtype=np.int64)
+    if not len(samples):
+        return np.empty((0, 3), np.uint8), indices
+
+    centers = _median_cut(samples, max_colors)
+    for _ in range(iterations):
+        nearest = _nearest(samples, centers)
+        counts = np.bincount(nearest, minlength=len(centers))
+        sums = np.stack([np.bincount(nearest, samples[:, channel], len(centers)) for channel in range(3)], axis=1)
+        moved = _merge_same(sums[counts > 0] / counts[counts > 0, None], counts[counts > 0])  # and empty dropped
+        converged = len(moved) == len(centers) and np.abs(moved - centers).max() < 0.5
+        centers = moved
+        if converged:
+            break
+
+    # centers may become the same color, when they are rounded
+    palette, merged = np.unique(np.rint(centers).astype(np.uint8), axis=0, return_inverse=True)
+    indices[opaque] = merged.reshape(-1)[_nearest(samples, centers)]
+    return palette, indices
+
+
+def convert(path: str, cells_num: tuple[int, int] = CELLS_NUM) -> tuple[tuple[int, ...], bytes]:
+    # palette (0xRRGGBB integers) and grid of art, both picklable, so images are converted in worker processes
+    palette, indices = quantize(downsample(load_image(path), cells_num))
+    if not len(palette):
+        raise ValueError(f'Image "{path}" has no opaque pixels')
+    rgb = palette.astype(np.uint32)
+    return tuple(map(int, rgb[:, 0] << 16 | rgb[:, 1] << 8 | rgb[:, 2])), (indices + 1).astype(np.uint8).tobytes()
+
+
+def _art_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _check_names(db: DataBase, names: Sequence[str], replace: bool) -> None:
+    # prepared arts are never replaced, the other existing ones only if it was asked for
+    if len(set(names)) != len(names):
+        raise ValueError('Several images have the same name')
+    for name in names:
+        if not name or name == CUSTOM:
+            raise ValueError(f'Invalid art name {name!r}')
+        summary = next(iter(db.get_art_summaries(1, name=name)), None)
+        if summary is None:
+            continue
+        if summary.is_prepared:
+            raise ValueError(f'Prepared art "{name}" can not be replaced')
+        if not replace:
+            raise ValueError(f'Art "{name}" already exists')
+
+
+def import_image(path: str, name: str = None, cells_num: tuple[int, int] = CELLS_NUM, db: DataBase = None,
+                 replace: bool = False) -> str:
+    # returns name of imported art, replaced art loses its best time and runs
+    name, db = name or _art_name(path), db or DataBase()
+    _check_names(db, (name,), replace)
+    db.save_art_row(name, NOT_PROVIDED, PackedArt(*convert(path, cells_num), cells_num))
+    return name
+
+
+def import_directory(directory: str, cells_num: tuple[int, int] = CELLS_NUM, db: DataBase = None,
+                     processes: int = None, replace: bool = False) -> tuple[str, ...]:
+    """
+    Imports every image of the directory, they are converted in parallel processes and saved in a single
+    transaction, so either every image is imported or none of them. Returns names of imported arts.
+    """
+    paths = sorted(entry.path for entry in os.scandir(directory)
+                   if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_SUFFIXES)
+    if not paths:
+        return ()
+    names, db = tuple(map(_art_name, paths)), db or DataBase()
+    _check_names(db, names, replace)
+
+    with ProcessPoolExecutor(processes) as pool:
+        arts = list(pool.map(partial(convert, cells_num=cells_num), paths))
+    db.save_art_rows((name, NOT_PROVIDED, PackedArt(palette, grid, cells_num))
+                     for name, (palette, grid) in zip(names, arts))
+    return names
+
+
+def main() -> None:
+    sizes = dict(('%dx%d' % cells_num, cells_num) for cells_num in CELLS_NUM_CHOICES)
+    parser = argparse.ArgumentParser(description='Imports PNG/JPEG images as SpeedPixels arts')
+    parser.add_argument('path', help='image or directory of images')
+    parser.add_argument('--size', choices=sizes, default='%dx%d' % CELLS_NUM, help='field size of imported arts')
+    parser.add_argument('--name', help='name of art imported from a single image (image file name by default)')
+    parser.add_argument('--processes', type=int, help='number of processes converting images of a directory')
+    parser.add_argument('--replace', action='store_true', help='replace user arts with the same names')
+    args = parser.parse_args()
+    if args.name is not None and os.path.isdir(args.path):
+        parser.error('--name is given for a single image only, arts of a directory are named after files')
+
+    try:
+        if os.path.isdir(args.path):
+            names = import_directory(args.path, sizes[args.size], processes=args.processes, replace=args.replace)
+        else:
+            names = (import_image(args.path, args.name, sizes[args.size], replace=args.replace),)
+    except ValueError as e:
+        parser.exit(1, f'{parser.prog}: error: {e}\n')
+    print(f'Imported {len(names)} arts: {", ".join(names)}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,80 +4,99 @@ __all__ = (
 
 import os
 import sys
-from typing import Never, TypeVar
+import time
+from functools import lru_cache
+from typing import Iterator, Never
 
-from PyQt5.QtCore import Qt, QEvent, QVariantAnimation, pyqtSignal
-from PyQt5.QtGui import QPalette, QBrush, QPixmap, QMouseEvent, QCloseEvent, QMovie, QIcon, QTransform
+from PyQt5.QtCore import (Qt, QVariantAnimation, QAbstractAnimation, pyqtSignal, QAbstractListModel, QModelIndex,
+                          QObject, QPointF, QSize, QTimer)
+from PyQt5.QtGui import QPalette, QBrush, QMouseEvent, QCloseEvent, QMovie, QPainter, QPaintEvent
 from PyQt5.QtWidgets import (QWidget, QGridLayout, QLabel, QVBoxLayout, QHBoxLayout, QPushButton,
-                             QScrollArea, QSpacerItem, QSizePolicy, QLayout)
+                             QListView, QSpacerItem, QSizePolicy, QLayout, QInputDialog)
 
-from arts import CustomArt, SavedArt
-from constants import MEDIA_URL, PREVIEWS_NUM_PER_ROW, Theme
-from utils import DataBase, set_text_color, update_stylesheet
-
-T = TypeVar('T')
+from assets import assets
+from constants import CELLS_NUM_CHOICES, MEDIA_URL, PIXEL_ART_MEDIA, PREVIEWS_NUM_PER_ROW, Theme
+from utils import ArtSummary, DataBase, RunStats, navigator, persistence, update_stylesheet
 
 db = DataBase()
 
 
+@lru_cache
+def _menu_stylesheet(theme_name: str) -> str:
+    # whole menu is restyled by a single stylesheet per theme, so switching does not restyle widgets one by one
+    theme = Theme(theme_name)
+    return (
+        f'#preview {{ background-color: {theme.PREVIEW_BACKGROUND_COLOR.name()}; padding: 10px; }}'
+        f'#preview:hover {{ background-color: {theme.HOVERED_PREVIEW_BACKGROUND_COLOR.name()}; }}'
+        f'#preview QLabel {{ color: {theme.FONT_COLOR.name()}; }}'
+        f'#action {{ background-color: {theme.PREVIEW_BACKGROUND_COLOR.name()}; color: {theme.FONT_COLOR.name()}; }}'
+    )
+
+
 class BasePreview(QWidget):
 
     def __init__(self, parent: QWidget, path: str) -> None:
         super().__init__(parent)
         self.parent = lambda: parent
-
-        self._images = {
-            'dark': QPixmap(path.format('dark')),
-            'light': QPixmap(path.format('light'))
-        }
+        self._path = path  # with theme placeholder
+        self.setObjectName('preview')  # styled by menu stylesheet
+        self.setAttribute(Qt.WA_StyledBackground)
 
         self._preview_img = QLabel(self)
         mrg = self.parent().width() // (PREVIEWS_NUM_PER_ROW * 3)
         self._image_width = self.parent().width() // PREVIEWS_NUM_PER_ROW - mrg
         self._image_height = round(self._image_width / 1.5)
-        self._preview_img.resize(self._image_width, self._image_height)
+        self._preview_img.setFixedSize(self._image_width, self._image_height)  # layout is not changed by image loading
 
-        self._theme: Theme = ...  # will be set in set_theme method
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def image_size(self) -> tuple[int, int]:
+        return self._image_width, self._image_height
 
     def set_theme(self, theme: Theme) -> None:
-        self._theme = theme
-        self._preview_img.setPixmap(self._images[theme.theme].scaled(self._image_width, self._image_height))
-        self.leaveEvent()  # forcing color setting on widget run
+        # only image is changed, colors come from menu stylesheet
+        self._preview_img.setPixmap(assets.pixmap(self._path, self.image_size, theme.theme))
         self.setFixedSize(self._preview_img.sizeHint() if self.sizeHint().isEmpty() else self.sizeHint())
 
-    def enterEvent(self, *e: QEvent) -> None:
-        self.setStyleSheet(f'background-color: {self._theme.HOVERED_PREVIEW_BACKGROUND_COLOR.name()}; padding: 10px;')
-
-    def leaveEvent(self, *e: QEvent) -> None:
-        self.setStyleSheet(f'background-color: {self._theme.PREVIEW_BACKGROUND_COLOR.name()}; padding: 10px;')
-
-    def mousePressEvent(self, *e: QMouseEvent, art: CustomArt | SavedArt) -> None:
-        self.parent().close()
-        art.show()
-
 
 class PreparedArtPreview(BasePreview):
 
-    def __init__(self, name: str, parent: QWidget) -> None:
-        super().__init__(parent, path=os.path.join(MEDIA_URL, '{}/%s_preview_img.png' % name))
+    def __init__(self, summary: ArtSummary, parent: QWidget) -> None:
+        super().__init__(parent, path=os.path.join(MEDIA_URL, '{}/%s_preview_img.png' % summary.name))
 
-        self._name = name
+        self._name = summary.name
 
         self._info_layout = QVBoxLayout(self)
         self._info_layout.setSpacing(0)
         self._info_layout.addWidget(self._preview_img)
-        try:
-            pb = db.get_art_row(name)[1]
-        except TypeError:
-            pb = '-'
-        self._info_layout.addWidget(QLabel(f'Name: {name}\n\nBest time: {pb}', self))
+        self._info_label = QLabel(self)
+        self._info_layout.addWidget(self._info_label)
+        self._time = summary.time
+        self._stats = summary.stats
+        self._update_info()
+
+    def _update_info(self) -> None:
+        text = f'Name: {self._name}\n\nBest time: {self._time}'
+        if self._stats is not None:
+            text += f'\n{self._stats.describe()}'
+        self._info_label.setText(text)
+
+    def set_best_time(self, time: float | str) -> None:
+        self._time = time
+        self._update_info()
+
+    def set_run_stats(self, stats: RunStats | None) -> None:
+        self._stats = stats
+        self._update_info()
 
     def set_theme(self, theme: Theme, *args: Never, **kwargs: Never) -> None:
         super().set_theme(theme)
-        set_text_color(self._info_layout, theme.FONT_COLOR)
 
     def mousePressEvent(self, *e: QMouseEvent) -> None:
-        super().mousePressEvent(*e, art=SavedArt(self._name))
+        navigator.show_art(self._name)
 
 
 class CustomArtPreview(BasePreview):
@@ -89,39 +108,63 @@ class CustomArtPreview(BasePreview):
         super().set_theme(theme)
 
     def mousePressEvent(self, *e: QMouseEvent) -> None:
-        super().mousePressEvent(*e, art=CustomArt())
+        sizes = dict((f'{columns}x{rows}', (columns, rows)) for columns, rows in CELLS_NUM_CHOICES)
+        size, ok = QInputDialog.getItem(self.parent(), 'Action', 'Choose field size', list(sizes), 0, False)
+        if ok:
+            navigator.show_art(cells_num=sizes[size])
 
 
-class UserArtsOverview(QWidget):
+class UserArtsModel(QAbstractListModel):
+    """
+    Names of user arts, fetched page by page while view is scrolled.
+    Views ask for the next page through canFetchMore/fetchMore, when the last loaded row becomes visible.
+    """
+
+    def __init__(self, page_size: int, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+
+        self._page_size = page_size
+        self._names: list[str] = []
+        self._last_id = 0  # keyset of the next page
+        self._exhausted = False
+        self._fetching = False  # guards against overlapping fetches, when view asks for more while inserting rows
 
-    class ScrollableAreaItem(QLabel):
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._names)
 
-        def __init__(self, theme: Theme, parent: QWidget = None, *args: T, **kwargs: T):
-            super().__init__(*args, **kwargs, parent=parent)
-            self.parent = lambda: parent
-            self._theme = theme
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> str | None:
+        if role == Qt.DisplayRole and index.isValid():
+            return self._names[index.row()]
 
-            self.setStyleSheet('padding-top: 4px; padding-bottom: 4px;')
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted
 
-        def enterEvent(self, *e: QEvent) -> None:
-            update_stylesheet(self, f'background-color: {self._theme.HOVERED_PREVIEW_BACKGROUND_COLOR.name()};')
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        if parent.isValid() or self._fetching or self._exhausted:
+            return
+
+        self._fetching = True
+        try:
+            page = db.get_art_summaries(limit=self._page_size, after_id=self._last_id, is_prepared=0)
+            self._exhausted = len(page) < self._page_size
+            if not page:
+                return
+            self.beginInsertRows(QModelIndex(), len(self._names), len(self._names) + len(page) - 1)
+            self._names.extend(summary.name for summary in page)
+            self._last_id = page[-1].id
+            self.endInsertRows()
+        finally:
+            self._fetching = False
 
-        def leaveEvent(self, *e: QEvent) -> None:
-            update_stylesheet(self, f'background-color: {self._theme.PREVIEW_BACKGROUND_COLOR.name()};')
 
-        def mousePressEvent(self, *e: QMouseEvent) -> None:
-            art = SavedArt(self.text())
-            art.show()
-            self.parent().close()
+class UserArtsOverview(QWidget):
 
-    def __init__(self, theme: Theme, limit: int, offset: int = 0, parent: QWidget | None = None) -> None:
+    def __init__(self, theme: Theme, limit: int, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self.parent = lambda: parent
         self.resize(self.parent().size())
 
         self._theme = theme
-        self._limit = limit
-        self._offset = offset
 
         self._view = QWidget(self)
         self._view.setStyleSheet(f'background-color: {theme.PREVIEW_BACKGROUND_COLOR.name()};')
@@ -136,42 +179,49 @@ class UserArtsOverview(QWidget):
         self._header_layout.addWidget(QLabel('My arts', self._header))
         self._close_widget = QLabel(self._header)
         self._close_widget.mousePressEvent = self.closeEvent
-        self._close_widget.setPixmap(QPixmap(os.path.join(MEDIA_URL, 'general/close_user_arts_overview.svg')))
+        self._close_widget.setPixmap(assets.pixmap(os.path.join(MEDIA_URL, 'general/close_user_arts_overview.svg')))
         self._header_layout.addWidget(self._close_widget, alignment=Qt.AlignRight)
 
-        self._scrollable = QScrollArea(self._view)
-        self._items_layout = QVBoxLayout(self._view)
-        self._items_layout.setSpacing(0)
-        self._items_layout.addStretch()
-        self._load_items()
-        area = QWidget()
-        area.setLayout(self._items_layout)
-        self._scrollable.setWidget(area)
-        self._scrollable.setWidgetResizable(True)
-        self._scrollable.verticalScrollBar().valueChanged.connect(self._on_scroll)
+        # list view paints only visible rows through a single delegate, so no widgets are created per art
+        self._model = UserArtsModel(page_size=limit, parent=self)
+        self._model.fetchMore()
+        self._list = QListView(self._view)
+        self._list.setModel(self._model)
+        self._list.setUniformItemSizes(True)  # rows height is not measured for every loaded art
+        self._list.setMouseTracking(True)
+        self._list.setEditTriggers(QListView.NoEditTriggers)
+        self._list.setStyleSheet(
+            f'QListView {{ color: {theme.FONT_COLOR.name()}; }}'
+            f'QListView::item {{ padding-top: 4px; padding-bottom: 4px; }}'
+            f'QListView::item:hover {{ background-color: {theme.HOVERED_PREVIEW_BACKGROUND_COLOR.name()}; }}'
+        )
+        self._list.clicked.connect(self._open_art)
 
         self._view.layout().addWidget(self._header)
-        self._view.layout().addWidget(self._scrollable)
-
-    def _on_scroll(self) -> None:
-        if self._scrollable.verticalScrollBar().value() > self._scrollable.verticalScrollBar().maximum() // 100 * 80:
-            self._load_items()
-
-    def _load_items(self) -> None:
-        for art_name in db.get_art_names(limit=self._limit, offset=self._offset, is_prepared=0):
-            item = self.ScrollableAreaItem(self._theme, self.parent(), art_name)
-            self._items_layout.insertWidget(self._items_layout.count() - 1, item)
-        self._offset += self._limit
-        if self._items_layout.count() == 1:  # if only spacer added
-            self._items_layout.insertWidget(0, QLabel("There's nothing here yet", self), alignment=Qt.AlignHCenter)
-        set_text_color(self._items_layout, self._theme.FONT_COLOR)
+        if self._model.rowCount():
+            self._view.layout().addWidget(self._list)
+        else:
+            self._list.hide()
+            empty = QLabel("There's nothing here yet", self._view)
+            update_stylesheet(empty, f'color: {theme.FONT_COLOR.name()};')
+            self._view.layout().addWidget(empty, alignment=Qt.AlignHCenter | Qt.AlignTop)
+
+    def _open_art(self, index: QModelIndex) -> None:
+        self.close()
+        navigator.show_art(self._model.data(index))
 
     def closeEvent(self, e: QCloseEvent) -> None:
         self.parent().setEnabled(True)
         self.close()
 
 
-class ThemeSwitcher(QLabel):
+class ThemeSwitcher(QWidget):
+    """
+    Image, which is rotated by 180 degrees on click. Theme is switched in the middle of rotation.
+    Image is rotated by painter transform on paint, so frames do not allocate rotated pixmaps.
+    Intervals between animation frames are measured (check frame_times property).
+    """
+
     switched = pyqtSignal(Theme)
 
     def __init__(self, parent: QWidget | None = None) -> None:
@@ -180,43 +230,80 @@ class ThemeSwitcher(QLabel):
         self._theme = Theme(db.get_setting_value('theme'))
 
         size = self.parent().height() // 5 // 3   # 1/3 height from _user_utils layout
-        self.setPixmap(QPixmap(os.path.join(MEDIA_URL, 'general/switch_theme.svg')).scaled(size, size))
+        self._pixmap = assets.pixmap(os.path.join(MEDIA_URL, 'general/switch_theme.svg'), (size, size))
         self.setMaximumSize(size + 15, size)  # 15px is an extra space for animation
         self.mousePressEvent = lambda e: self._animate()
 
-        self._pixmap = self.pixmap().copy()
+        self._angle = 0  # image rotation, when animation is not running
+        self._value = 0  # current animation value
         self._animation = QVariantAnimation(self)
         self._animation.setStartValue(0)
         self._animation.setEndValue(180)
         self._animation.setDuration(1000)
-        self._animation.valueChanged.connect(lambda value: self._rotate(value))
+        self._animation.valueChanged.connect(self._rotate)
         self._is_signal_emitted = False
 
+        self._frame_times: list[int] = []  # ns between frames of the last animation
+        self._last_frame_ns: int | None = None
+
     @property
     def theme(self) -> Theme:
         return self._theme
 
+    @property
+    def frame_times(self) -> tuple[float, ...]:
+        # milliseconds between frames of the last (or running) animation
+        return tuple(ns / 1_000_000 for ns in self._frame_times)
+
+    def sizeHint(self) -> QSize:
+        return self._pixmap.size()
+
     def _rotate(self, value: int) -> None:
-        self.setPixmap(self._pixmap.transformed(QTransform().rotate(value)))
+        now = time.perf_counter_ns()
+        if self._last_frame_ns is not None:
+            self._frame_times.append(now - self._last_frame_ns)
+        self._last_frame_ns = now
+
+        self._value = value
+        self.update()
         if self._is_signal_emitted is False and value > self._animation.endValue() // 2:
             self._is_signal_emitted = True
             self._theme = self._theme.switch()
             self.switched.emit(self._theme)
         if value == self._animation.endValue():
             self._is_signal_emitted = False
-            self._pixmap = self.pixmap().copy()
+            self._angle = (self._angle + value) % 360
+            self._value = 0
+            self._last_frame_ns = None
 
     def _animate(self) -> None:
+        if self._animation.state() != QAbstractAnimation.Running:
+            self._frame_times.clear()
         self._animation.start()
 
+    def paintEvent(self, e: QPaintEvent) -> None:
+        center = QPointF(self._pixmap.width() / 2, self._pixmap.height() / 2)
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.translate(center)
+        painter.rotate(self._angle + self._value)
+        painter.translate(-center)
+        painter.drawPixmap(0, 0, self._pixmap)
+
 
 class Menu(QWidget):
+    """
+    Window frame with widgets is shown at once, images are loaded progressively after the first paint
+    (one by one, every in its own event loop iteration). Art windows module is not imported by menu.
+    """
+
+    loaded = pyqtSignal()  # all images are loaded
 
     def __init__(self) -> None:
         super().__init__()
 
         self.setWindowTitle('SpeedPixels')
-        self.setWindowIcon(QIcon(os.path.join(MEDIA_URL, 'general/icon.svg')))
+        self.setWindowIcon(assets.icon(os.path.join(MEDIA_URL, 'general/icon.svg')))
 
         self.setWindowFlags(Qt.FramelessWindowHint)
         self.setGeometry(self.screen().geometry())
@@ -227,25 +314,26 @@ class Menu(QWidget):
         self._prepared_previews_layout = QGridLayout(self)
         self._prepared_previews_layout.setSizeConstraint(QLayout.SetMinimumSize)
         self._prepared_previews_layout.setSpacing(0)
-        prepared_art_names = db.get_art_names(is_prepared=1)
-        for idx in range(len(prepared_art_names)):
-            self._prepared_previews_layout.addWidget(
-                PreparedArtPreview(prepared_art_names[idx], self),
-                idx // PREVIEWS_NUM_PER_ROW,
-                idx % PREVIEWS_NUM_PER_ROW
-            )
+        self._prepared_previews: dict[str, PreparedArtPreview] = {}
+        prepared_arts = db.get_art_summaries(is_prepared=1)
+        for idx in range(len(prepared_arts)):
+            preview = self._prepared_previews[prepared_arts[idx].name] = PreparedArtPreview(prepared_arts[idx], self)
+            self._prepared_previews_layout.addWidget(preview, idx // PREVIEWS_NUM_PER_ROW, idx % PREVIEWS_NUM_PER_ROW)
 
         self._user_utils = QHBoxLayout(self)
 
         self._add_custom = CustomArtPreview(self)
         self._theme_switcher = ThemeSwitcher(self)
-        self._theme_switcher.switched.connect(lambda theme: self._set_theme(theme))
+        self._theme_switcher.switched.connect(self._on_theme_switch)
+        persistence.written.connect(self._on_art_write)
         self._user_utils.addWidget(self._theme_switcher, alignment=Qt.AlignBottom | Qt.AlignLeft)
         self._user_utils.addWidget(self._add_custom)
         self._actions_layout = QVBoxLayout(self)
         self._show_user_arts_btn = QPushButton('My arts', self)
+        self._show_user_arts_btn.setObjectName('action')
         self._show_user_arts_btn.clicked.connect(self._show_user_arts)
         self._exit_btn = QPushButton('Exit', self)
+        self._exit_btn.setObjectName('action')
         self._exit_btn.clicked.connect(sys.exit)
         self._exit_btn.setMaximumWidth(self._show_user_arts_btn.sizeHint().width() * 2)
         self._actions_layout.addSpacerItem(QSpacerItem(0, 0, QSizePolicy.Minimum, QSizePolicy.Expanding))
@@ -255,8 +343,7 @@ class Menu(QWidget):
         self._user_utils.addLayout(self._actions_layout)
 
         self._logo_layout = QVBoxLayout(self)
-        self._logo = QMovie(os.path.join(MEDIA_URL, 'general/logo.gif'))
-        self._logo.start()
+        self._logo = QMovie(os.path.join(MEDIA_URL, 'general/logo.gif'))  # decoded, when it's started
         self._logo_label = QLabel(self)
         self._logo_label.setMovie(self._logo)
         self._logo_layout.addWidget(self._logo_label, alignment=Qt.AlignHCenter)
@@ -265,27 +352,70 @@ class Menu(QWidget):
         self._main_layout.addLayout(self._prepared_previews_layout, stretch=3)  # 60% of window height
         self._main_layout.addLayout(self._user_utils, stretch=1)  # 20% of window height
 
-        self._backgrounds = {
-            'dark': QPixmap(Theme('dark').MENU_BACKGROUND_IMAGE_URL),
-            'light': QPixmap(Theme('light').MENU_BACKGROUND_IMAGE_URL)
-        }
-        self._set_theme(self._theme_switcher.theme)
+        self.setStyleSheet(_menu_stylesheet(self._theme_switcher.theme.theme))
+        self._loading = self._load()
+        self._is_loading_started = False  # loading starts after the first paint
+
+    def _load(self) -> Iterator[None]:
+        # theme is read on every step, because it may be switched while menu is loading
+        self._set_background(self._theme_switcher.theme)
+        yield
+        self._logo.start()
+        yield
+        for preview in (*self._prepared_previews.values(), self._add_custom):
+            preview.set_theme(self._theme_switcher.theme)
+            yield
+
+        # images of another theme are decoded and scaled to their sizes in menu while user looks at it,
+        # so switching theme only swaps cached pixmaps. Images of art windows are decoded as well
+        other = self._theme_switcher.theme.switch()
+        assets.prewarm((other.MENU_BACKGROUND_IMAGE_URL,), size=self.size())
+        assets.prewarm((*(preview.path for preview in self._prepared_previews.values()), self._add_custom.path),
+                       themes=(other.theme,), size=self._add_custom.image_size)
+        assets.prewarm(PIXEL_ART_MEDIA)
+        self.loaded.emit()
+
+    def _load_next(self) -> None:
+        try:
+            next(self._loading)
+        except StopIteration:
+            return
+        QTimer.singleShot(0, self._load_next)  # window is painted before the next step
+
+    def paintEvent(self, e: QPaintEvent) -> None:
+        super().paintEvent(e)
+        if not self._is_loading_started:
+            self._is_loading_started = True
+            QTimer.singleShot(0, self._load_next)
 
     def _show_user_arts(self) -> None:
         self.setEnabled(False)
         area = UserArtsOverview(self._theme_switcher.theme, limit=50, parent=self)
         area.show()
 
-    def _set_theme(self, theme: Theme) -> None:
-        self._bg.setBrush(QPalette.Background, QBrush(self._backgrounds[theme.theme].scaled(self.size())))
+    def _set_background(self, theme: Theme) -> None:
+        self._bg.setBrush(QPalette.Background, QBrush(assets.pixmap(theme.MENU_BACKGROUND_IMAGE_URL, self.size())))
         self.setPalette(self._bg)
-        self._show_user_arts_btn.setStyleSheet(f'background-color: {theme.PREVIEW_BACKGROUND_COLOR.name()};')
-        self._exit_btn.setStyleSheet(f'background-color: {theme.PREVIEW_BACKGROUND_COLOR.name()};')
-        set_text_color(self._actions_layout, theme.FONT_COLOR)
-        for idx in range(self._prepared_previews_layout.count()):
-            self._prepared_previews_layout.itemAt(idx).widget().set_theme(theme)
+
+    def _set_theme(self, theme: Theme) -> None:
+        self._set_background(theme)
+        self.setStyleSheet(_menu_stylesheet(theme.theme))
+        for preview in self._prepared_previews.values():
+            preview.set_theme(theme)
         self._add_custom.set_theme(theme)
-        db.set_settings(theme=theme.theme)
+
+    def _on_theme_switch(self, theme: Theme) -> None:
+        self._set_theme(theme)
+        db.set_settings(theme=theme.theme)  # written behind, so the switcher animation does not wait for database
+
+    def set_best_time(self, name: str, time: float | str) -> None:
+        if name in self._prepared_previews:  # user arts are listed without times
+            self._prepared_previews[name].set_best_time(time)
+
+    def _on_art_write(self, name: str) -> None:
+        # run stats are read from a single aggregates row, when finished run of art has been written
+        if name in self._prepared_previews:
+            self._prepared_previews[name].set_run_stats(db.get_run_stats(name))
 
     def setEnabled(self, value: bool) -> None:
         for child in self.children():
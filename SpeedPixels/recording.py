@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+__all__ = (
+    'Ghost',
+    'Recording',
+    'Replay',
+    'RunRecorder',
+    'RunWriter',
+    'load_pb',
+    'replay',
+    'run_writer',
+    'verify'
+)
+
+import atexit
+import hashlib
+import os
+import shutil
+import time
+from array import array
+from collections import deque
+from typing import Any, Iterator, NamedTuple
+
+from background import BackgroundQueue
+from board import BoardState, Click
+from constants import RUNS_URL
+
+MAGIC = b'SPXR\x01'  # format name and version
+KEPT_RUNS_NUM = 10  # recordings of the last runs of an art, which are kept besides the best one
+
+
+def _write_varint(value: int, out: bytearray) -> None:
+    # unsigned LEB128: 7 bits per byte, high bit is set on every byte but the last one
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:  # returns value and position after it
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _varints(data: bytes, pos: int) -> Iterator[int]:
+    # values from pos until the end of data, truncated value at the end (of interrupted write) is dropped
+    value = shift = 0
+    for byte in memoryview(data)[pos:]:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+def run_dir(name: str) -> str:
+    # art names may contain any characters, so directories are named by their hashes
+    return os.path.join(RUNS_URL, hashlib.sha1(name.encode()).hexdigest()[:16])
+
+
+def pb_path(name: str) -> str:
+    return os.path.join(run_dir(name), 'pb.run')
+
+
+class Recording:
+    """
+    Clicks of an art run with their times.
+    Encoded recording is MAGIC, columns, rows, palette size, palette QRgb values, name size and UTF-8 name,
+    followed by (delta ms, cell index, color number) of every click and (delta ms, number of cells) of the finish.
+    Every number is varint, so a click usually takes 3-4 bytes and recording is appended to while run lasts.
+
+    Color number 0 is empty color, 1..n are palette colors and the following ones are other colors,
+    which are replayed as distinct QRgb values with zero alpha (never produced by opaque QColor objects).
+    """
+
+    def __init__(self, name: str, cells_num: tuple[int, int], palette: tuple[int, ...],
+                 events: list[int] = ..., time: int | None = None) -> None:
+        self.name = name
+        self.cells_num = cells_num
+        self.palette = palette
+        self.events = events if events != Ellipsis else []  # flat (delta ms, cell index, color number) triples
+        self.time = time  # ms from run start until finish, None if run was not finished
+
+    def __len__(self) -> int:  # number of clicks
+        return len(self.events) // 3
+
+    def header(self) -> bytes:
+        out = bytearray(MAGIC)
+        for value in (*self.cells_num, len(self.palette), *self.palette):
+            _write_varint(value, out)
+        name = self.name.encode()
+        _write_varint(len(name), out)
+        return bytes(out + name)
+
+    def encode(self) -> bytes:
+        out = bytearray(self.header())
+        for value in self.events:
+            _write_varint(value, out)
+        if self.time is not None:
+            _write_varint(self.time - sum(self.events[::3]), out)
+            _write_varint(self.cells_num[0] * self.cells_num[1], out)
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, data: bytes) -> Recording:
+        if not data.startswith(MAGIC):
+            raise ValueError('Data is not a run recording')
+        try:
+            pos = len(MAGIC)
+            columns, pos = _read_varint(data, pos)
+            rows, pos = _read_varint(data, pos)
+            palette_num, pos = _read_varint(data, pos)
+            palette = []
+            for _ in range(palette_num):
+                rgb, pos = _read_varint(data, pos)
+                palette.append(rgb)
+            name_num, pos = _read_varint(data, pos)
+        except IndexError:
+            raise ValueError('Run recording header is truncated') from None
+        name = data[pos:pos + name_num].decode()
+
+        events, time = list(_varints(data, pos + name_num)), None
+        if len(events) % 3 == 2 and events[-1] == columns * rows:  # finish
+            time = sum(events[:-2:3]) + events[-2]
+            del events[-2:]
+        else:
+            del events[len(events) - len(events) % 3:]  # click of interrupted write
+        if max(events[1::3], default=0) >= columns * rows:
+            raise ValueError('Run recording contains cells out of the field')
+
+        return cls(name, (columns, rows), tuple(palette), events, time)
+
+    def color_lookup(self) -> list[int]:
+        # QRgb value of every color number used in events
+        others = max(self.events[2::3], default=0) - len(self.palette)
+        return [0, *self.palette, *range(1, others + 1)]
+
+
+class Replay(NamedTuple):
+    time: int | None  # recorded finish time in ms, None if run was not finished
+    elapsed: int  # ms of the last click
+    clicks: int
+    filled: bool  # whether replayed clicks fill the art
+
+
+def replay(recording: Recording, saved_colors: array, board: BoardState = None) -> Replay:
+    """Re-simulates the run on the board (a new one if it is not given), no Qt objects are needed."""
+    if board is None:
+        board = BoardState(recording.cells_num)
+    elif board.cells_num != recording.cells_num:
+        board.resize(recording.cells_num)
+    if len(saved_colors) != len(board):
+        raise ValueError('Recording was made for an art of another size')
+    board.set_saved_colors(saved_colors)
+    board.set_colors(0)
+    if board.palette != recording.palette:
+        raise ValueError('Recording was made for another art')
+
+    events, click, lookup = recording.events, board.click, recording.color_lookup()
+    for index, color in zip(events[1::3], events[2::3]):
+        click(index, lookup[color])
+    return Replay(recording.time, sum(events[::3]), len(recording), board.is_filled)
+
+
+def verify(recording: Recording, saved_colors: array, best_time: float | str, board: BoardState = None) -> bool:
+    # whether the recording is a finished run, which fills the art exactly in best time (seconds)
+    try:
+        claimed = round(float(best_time) * 1000)
+        result = replay(recording, saved_colors, board)
+    except (ValueError, TypeError):
+        return False
+    return result.filled and result.time == claimed
+
+
+def load_pb(name: str) -> Recording | None:  # recording of the best run of the art, if it was recorded
+    try:
+        with open(pb_path(name), 'rb') as file:
+            return Recording.decode(file.read())
+    except (OSError, ValueError, UnicodeDecodeError):
+        return None
+
+
+class RunWriter:
+    """
+    Writes recordings to their files through a background queue, so clicks never wait for disk.
+    Appends to the same file, which are waiting in queue, are written at once.
+    """
+
+    def __init__(self) -> None:
+        self._queue = BackgroundQueue('run-writer', self._run_job, self._take_job)
+
+    def append(self, path: str, data: bytes) -> None:
+        self._queue.submit(('append', path, data))
+
+    def copy(self, source: str, path: str) -> None:
+        self._queue.submit(('copy', path, source))
+
+    def prune(self, directory: str, kept: int = KEPT_RUNS_NUM) -> None:  # pb.run is always kept
+        self._queue.submit(('prune', directory, kept))
+
+    @staticmethod
+    def _take_job(jobs: deque[tuple[str, str, Any]]) -> tuple[str, str, Any]:  # (kind, path, argument)
+        kind, path, data = jobs.popleft()
+        if kind == 'append':
+            chunks = [data]
+            while jobs and jobs[0][:2] == (kind, path):
+                chunks.append(jobs.popleft()[2])
+            data = b''.join(chunks)
+        return kind, path, data
+
+    @staticmethod
+    def _run_job(job: tuple[str, str, Any]) -> None:
+        kind, path, data = job
+        try:
+            if kind == 'append':
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'ab') as file:
+                    file.write(data)
+            elif kind == 'copy':
+                shutil.copyfile(data, path)
+            else:
+                # run files are named by their start time, so the oldest ones are removed
+                runs = sorted(entry.name for entry in os.scandir(path)
+                              if entry.name.endswith('.run') and entry.name != 'pb.run')
+                for name in runs[:max(0, len(runs) - data)]:
+                    os.remove(os.path.join(path, name))
+        except OSError:
+            pass  # game goes on without the recording, it is replayed as unfinished one
+
+    def close(self) -> None:  # blocks until every submitted job is done
+        self._queue.close()
+
+
+class RunRecorder:
+    """
+    Records clicks of a run and streams them to a new run file through writer, the oldest run files are pruned.
+    Click times are taken from run timer, so recorded time matches the measured one (pauses are excluded).
+    """
+
+    def __init__(self, writer: RunWriter = None) -> None:
+        self._writer = writer or run_writer
+        self._name: str | None = None  # None if run is not recorded
+        self._path = ''
+        self._data = bytearray()  # the whole recording, so it does not have to be read back
+        self._colors: dict[int, int] = {}  # QRgb value -> color number
+        self._last = 0  # ms of the last click
+        self._cells = 0
+
+    def start(self, name: str, board: BoardState) -> None:
+        self._name = name
+        self._path = os.path.join(run_dir(name), f'{time.time_ns()}.run')
+        self._data = bytearray(Recording(name, board.cells_num, board.palette).header())
+        self._colors = {0: 0, **{rgb: number for number, rgb in enumerate(board.palette, 1)}}
+        self._last = 0
+        self._cells = len(board)
+        self._writer.append(self._path, bytes(self._data))
+        self._writer.prune(run_dir(name))
+
+    def _write(self, *values: int) -> None:
+        chunk = bytearray()
+        for value in values:
+            _write_varint(value, chunk)
+        self._data += chunk
+        self._writer.append(self._path, bytes(chunk))
+
+    def click(self, milliseconds: int, index: int, rgb: int) -> None:
+        if self._name is None:
+            return
+        color = self._colors.get(rgb)
+        if color is None:
+            color = self._colors[rgb] = len(self._colors)
+        self._write(max(0, milliseconds - self._last), index, color)
+        self._last = max(self._last, milliseconds)
+
+    def finish(self, milliseconds: int, pb: bool = False) -> Recording | None:
+        # art is filled, recording of the best run is also copied to be replayed as a ghost
+        if self._name is None:
+            return
+        self._write(max(0, milliseconds - self._last), self._cells)
+        if pb:
+            self._writer.copy(self._path, pb_path(self._name))
+        self._name = None
+        return Recording.decode(bytes(self._data))
+
+    def cancel(self) -> None:  # run file is left without finish
+        self._name = None
+
+
+class Ghost:
+    """
+    Replays a recording along the current run: advancing it to run time gives cells changed on the way.
+    """
+
+    def __init__(self, recording: Recording, saved_colors: array) -> None:
+        self.board = BoardState(recording.cells_num)
+        self.board.set_saved_colors(saved_colors)
+        self._recording = recording
+        self._lookup = recording.color_lookup()
+        self._next = 0  # position of the next click in events
+        self._time = 0  # ms of the last replayed click
+
+    @property
+    def colors(self) -> array:
+        return self.board.colors
+
+    def reset(self) -> None:
+        self.board.set_colors(0)
+        self._next = self._time = 0
+
+    def advance(self, milliseconds: int) -> list[int]:
+        events, changed = self._recording.events, []
+        while self._next < len(events) and self._time + events[self._next] <= milliseconds:
+            self._time += events[self._next]
+            index = events[self._next + 1]
+            if self.board.click(index, self._lookup[events[self._next + 2]]) not in (Click.IGNORED, Click.OVERFLOW):
+                changed.append(index)
+            self._next += 3
+        return changed
+
+
+run_writer = RunWriter()
+atexit.register(run_writer.close)
@@ -1,42 +1,98 @@
 from __future__ import annotations
 
 __all__ = (
+    'ArtSummary',
+    'ConnectionPool',
     'Countdown',
     'DataBase',
+    'Navigator',
+    'PackedArt',
+    'Persistence',
+    'RunStats',
+    'Settings',
+    'StartupProfiler',
     'Timer',
+    'TimeSketch',
     'set_text_color',
     'update_stylesheet',
-    'load_menu'
+    'navigator',
+    'persistence'
 )
 
+import atexit
+import math
+import re
 import sqlite3
-from typing import Callable, Iterable, Iterator, TypeVar, Any
-
-from PyQt5.QtCore import QTimer, QTime, Qt, QSize
-from PyQt5.QtGui import QColor, QPixmap
-from PyQt5.QtWidgets import QWidget, QLabel, QHBoxLayout, QLayout
-
-from constants import DB_URL, PIXELARTS_DB_TABLE_NAME, SETTINGS_DB_TABLE_NAME, NOT_PROVIDED
+import threading
+import time
+from array import array
+from collections import Counter, deque
+from weakref import WeakKeyDictionary
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, NamedTuple, Sequence, TypeVar, Any
+
+from PyQt5.QtCore import QEvent, QObject, QTimer, Qt, QSize, pyqtSignal
+from PyQt5.QtGui import QColor, QPixmap, QPalette
+from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QHBoxLayout, QLayout
+
+from assets import assets
+from background import BackgroundQueue
+from constants import (DB_URL, PIXELARTS_DB_TABLE_NAME, SETTINGS_DB_TABLE_NAME, SETTINGS, CELLS_NUM, MAX_CELLS_NUM,
+                       MAX_COLORS_NUM, NOT_PROVIDED)
 
 T = TypeVar('T')
 K = TypeVar('K')
 V = TypeVar('V')
 SupportsStylesheet = TypeVar('SupportsStylesheet')
-SupportsCloseAndShow = TypeVar('SupportsCloseAndShow')
-
 
-def load_menu(current_widget: SupportsCloseAndShow = None) -> None:
-    from menu import Menu
 
-    w = Menu()
-    w.show()
+class Navigator:
+    """
+    Switches application between menu and art windows.
+    Windows are created once and reused: menu is only hidden, art windows load another art into their field
+    instead of being rebuilt. Menu previews are refreshed only for arts, which best time was changed.
+    """
 
-    if current_widget is None:
-        return
+    def __init__(self) -> None:
+        self._menu: QWidget | None = None
+        self._arts: dict[type, QWidget] = {}  # art window of every kind (custom and saved ones)
+        self._current: QWidget | None = None
 
-    while hasattr(current_widget, 'parent') and current_widget.parent():
-        current_widget = current_widget.parent()
-    current_widget.close()
+    @property
+    def menu(self) -> QWidget | None:
+        return self._menu
+
+    def _switch(self, widget: QWidget) -> None:
+        widget.show()  # new window is shown first, so application does not quit without visible windows
+        if self._current is not None and self._current is not widget:
+            self._current.hide()
+        self._current = widget
+
+    def show_menu(self) -> None:
+        if self._menu is None:
+            from menu import Menu
+            self._menu = Menu()
+        self._switch(self._menu)
+
+    def show_art(self, name: str = None, cells_num: tuple[int, int] = CELLS_NUM) -> None:
+        # saved arts are opened by name, custom art by its field size
+        from arts import CustomArt, SavedArt
+
+        kind = CustomArt if name is None else SavedArt
+        art = self._arts.get(kind)
+        if art is None:
+            art = self._arts[kind] = SavedArt(name) if kind is SavedArt else CustomArt(cells_num=cells_num)
+            art.pb_changed.connect(self._on_pb_change)
+        elif kind is SavedArt:
+            art.load(name)
+        else:
+            art.load(cells_num)
+        self._switch(art)
+
+    def _on_pb_change(self, name: str, time: float) -> None:
+        if self._menu is not None:
+            self._menu.set_best_time(name, time)
 
 
 def set_text_color(layout: QLayout, color: QColor) -> None:
@@ -47,19 +103,126 @@ def set_text_color(layout: QLayout, color: QColor) -> None:
             continue
 
 
+class StartupProfiler(QObject):
+    """
+    Records moments of startup stages (check mark method), including the end of the first paint of a watched window.
+    """
+
+    FIRST_PAINT = 'first paint'
+
+    def __init__(self, start_ns: int = None) -> None:
+        super().__init__()
+        self._start_ns = start_ns or time.perf_counter_ns()
+        self._stages: list[tuple[str, int]] = []
+        self._window: QWidget | None = None
+
+    @property
+    def stages(self) -> dict[str, float]:  # stage -> milliseconds since start
+        return {stage: (ns - self._start_ns) / 1_000_000 for stage, ns in self._stages}
+
+    def mark(self, stage: str) -> None:
+        self._stages.append((stage, time.perf_counter_ns()))
+
+    def watch_first_paint(self, window: QWidget) -> None:
+        self._window = window
+        window.installEventFilter(self)
+
+    def eventFilter(self, obj: QObject, e: QEvent) -> bool:
+        if obj is self._window and e.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            self._window = None
+            QTimer.singleShot(0, lambda: self.mark(self.FIRST_PAINT))  # paint event is handled before timers
+        return False
+
+    def report(self) -> str:
+        lines, previous = [f'{"stage":<24}{"total, ms":>12}{"step, ms":>12}'], 0.0
+        for stage, total in self.stages.items():
+            lines.append(f'{stage:<24}{total:>12.1f}{total - previous:>12.1f}')
+            previous = total
+        # media cache shows, how much of startup was spent on decoding files
+        stats = assets.stats
+        lines.append(f'assets: {stats.hits} hits, {stats.misses} misses, {stats.pixmaps} pixmaps, {stats.icons} icons, '
+                     f'{stats.bytes / 1024 / 1024:.1f} MiB, {stats.prewarmed} prewarmed')
+        return '\n'.join(lines)
+
+
+class _StyleState:
+    __slots__ = ('styles', 'text')
+
+    def __init__(self, text: str) -> None:
+        self.styles = dict(_parse_styles(text))  # every style applied to the widget
+        self.text = text  # stylesheet, which was set on the widget last time
+
+
+# Styles applied with update_stylesheet are cached per widget, so stylesheets are not reparsed on every call
+# and are not set again if nothing has changed.
+# Text color of labels without own stylesheet is set through their palette, so Qt does not parse and polish
+# anything. Stylesheet of an ancestor still applies to them, as long as it does not set text color itself
+_style_states: WeakKeyDictionary[SupportsStylesheet, _StyleState] = WeakKeyDictionary()
+_TEXT_COLOR_RE = re.compile(r'(?:^|[\s;{])color\s*:')
+
+
 def update_stylesheet(obj: SupportsStylesheet, styles: str) -> None:
-    obj.setStyleSheet(_remove_styles_repeat(f'{obj.styleSheet()} {styles}'.strip()))
+    text = obj.styleSheet()
+    state = _style_states.get(obj)
+    if state is None or state.text != text:  # first call or stylesheet has been set directly
+        state = _style_states[obj] = _StyleState(text)
+
+    parsed = _parse_styles(styles)
+    if not text and isinstance(obj, QLabel) and all(k == 'color' for k, _ in parsed) and not _is_text_styled(obj):
+        state.styles.update(parsed)  # stylesheet set later keeps the color
+        _set_text_color(obj, state.styles['color'])
+        return
+
+    changed = dict(style for style in parsed if state.styles.get(style[0]) != style[1])
+    if not changed:
+        return
+    state.styles.update(changed)
+    state.text = '; '.join(map(lambda item: ': '.join(item), state.styles.items())) + ';'
+    obj.setStyleSheet(state.text)
 
 
-def _remove_styles_repeat(styles: str) -> str:
-    dct = {}
-    for style in filter(lambda x: x, styles.split(';')):
-        k, v = map(str.strip, style.split(':'))
-        dct[k] = v
-    return '; '.join(map(lambda item: ': '.join(item), dct.items())) + ';'
+def _is_text_styled(obj: QWidget) -> bool:
+    widget = obj.parentWidget()
+    while widget is not None:
+        if _sets_text_color(widget.styleSheet()):
+            return True
+        widget = widget.parentWidget()
+    return _sets_text_color(QApplication.instance().styleSheet())
+
+
+@lru_cache(maxsize=64)
+def _sets_text_color(stylesheet: str) -> bool:
+    return bool(_TEXT_COLOR_RE.search(stylesheet))
+
+
+def _set_text_color(obj: QLabel, value: str) -> None:
+    # palette is compared instead of cached styles, because restyling of an ancestor resets it
+    color = QColor(value)
+    if not color.isValid():
+        raise ValueError(f'Invalid color "{value}"')
+    palette = obj.palette()
+    if palette.color(QPalette.WindowText) != color:
+        palette.setColor(QPalette.WindowText, color)
+        obj.setPalette(palette)
+
+
+@lru_cache(maxsize=256)
+def _parse_styles(styles: str) -> tuple[tuple[str, str], ...]:
+    parsed = []
+    for style in filter(lambda x: x.strip(), styles.split(';')):
+        k, sep, v = style.partition(':')
+        if not sep:
+            raise ValueError(f'Invalid style "{style.strip()}"')
+        parsed.append((k.strip(), v.strip()))
+    return tuple(parsed)
 
 
 class Countdown(QTimer):
+    """
+    Shows frames (paths to images) one by one over the parent widget.
+    Frames are decoded and scaled once per countdown size and shared through the assets cache.
+    """
 
     def __init__(self, parent: QWidget, before: Iterable[Callable] = ..., after: Iterable[Callable] = ...) -> None:
         super().__init__()
@@ -74,6 +237,7 @@ class Countdown(QTimer):
         self._before = before if before != Ellipsis else ()
         self._after = after if after != Ellipsis else ()
         self._frames: Iterator = ...  # will be set in start method
+        self._frame_size = (0, 0)  # will be set in resize method
 
         self.timeout.connect(self._callback)
         self.resize(parent.size())
@@ -85,12 +249,12 @@ class Countdown(QTimer):
 
     def _callback(self) -> None:
         try:
-            self._surface.setPixmap(next(self._frames).scaled(self._bg.height() // 3, self._bg.height() // 3))
+            self._surface.setPixmap(assets.pixmap(next(self._frames), self._frame_size))
         except StopIteration:
             self._invoke(*self._after)
             self.stop()
 
-    def start(self, delay: int, *frames: QPixmap) -> None:
+    def start(self, delay: int, *frames: str) -> None:
         self.stop()
         self._invoke(*self._before)
         self._frames = iter(frames)
@@ -103,157 +267,752 @@ class Countdown(QTimer):
 
     def resize(self, size: QSize) -> None:
         self._bg.resize(size)
+        self._frame_size = (size.height() // 3, size.height() // 3)
 
 
 class Timer(QLabel):
+    """
+    Measures time with monotonic high-resolution clock, exact run, pause and stop moments are recorded.
+    Label is only refreshed to show measured time, not more often than screen refresh rate
+    (or every update_delay milliseconds if it is provided). Missed or late refreshes do not affect measurement.
+    """
 
-    def __init__(self, widget: QWidget, text: str = None, update_delay: int = 50) -> None:
+    def __init__(self, widget: QWidget, text: str = None, update_delay: int = None) -> None:
         super().__init__(widget)
 
         self._text = text or ''
 
-        self._update_delay = update_delay
-        self._view = QTime(0, 0, 0)
+        self._update_delay = update_delay or max(1, round(1000 / (self.screen().refreshRate() or 60)))
+        self._elapsed_ns = 0  # measured before the last run call
+        self._started_ns: int | None = None  # clock value at the last run call, None if timer is not running
         self._timer = QTimer()
+        self._timer.setTimerType(Qt.PreciseTimer)
         self._timer.timeout.connect(self._update)
 
+    @property
+    def nanoseconds(self) -> int:
+        if self._started_ns is None:
+            return self._elapsed_ns
+        return self._elapsed_ns + time.perf_counter_ns() - self._started_ns
+
     @property
     def milliseconds(self) -> int:
-        return self._view.msecsSinceStartOfDay()
+        return self.nanoseconds // 1_000_000
 
     def run(self) -> None:
+        if self._started_ns is None:
+            self._started_ns = time.perf_counter_ns()
         self._timer.start(self._update_delay)
 
     def pause(self) -> None:
+        if self._started_ns is not None:
+            self._elapsed_ns += time.perf_counter_ns() - self._started_ns
+            self._started_ns = None
+            self._update()  # shows exact time of pause
         self._timer.stop()
 
-    def drop(self, save_text: bool = False) -> None:
-        self.setText(f'{self._text}0.00' if save_text else '')
+    def stop(self) -> int:  # pauses timer and returns exact measured time in milliseconds
         self.pause()
-        self._view = QTime(0, 0, 0)
+        return self.milliseconds
+
+    def drop(self, save_text: bool = False) -> None:
+        self._timer.stop()
+        self._started_ns = None
+        self._elapsed_ns = 0
+        self.setText(f'{self._text}{self.to_str(0)}' if save_text else '')
 
     @staticmethod
     def to_str(milliseconds: int, separator: str = ...) -> str:
         if not isinstance(separator, str):
             separator = '.'
-        return f'{milliseconds // 1000}{separator}{str(milliseconds % 1000).rstrip("0"):0<2}'
+        return f'{milliseconds // 1000}{separator}{f"{milliseconds % 1000:03}".rstrip("0"):0<2}'
 
     def _to_str(self) -> str:
         return f'{self._text}{self.to_str(self.milliseconds)}'
 
     def _update(self) -> None:
-        self._view = self._view.addMSecs(self._update_delay)
         self.setText(self._to_str())
 
 
-class DataBase:
+class PackedArt:
+    """
+    Compact art representation: palette of up to MAX_COLORS_NUM colors and a grid with one byte per cell.
+    Grid byte is 0 for an empty cell and N for a cell painted with N-th palette color.
+    Cells are ordered row by row, grid size (columns, rows) is kept separately from the grid.
+
+    Serialized layout is [palette length][r, g, b for every palette color][grid bytes].
+    Deserialization does not copy the grid, it is kept as a memoryview over the source buffer.
+    """
+
+    def __init__(self, palette: Sequence[int], grid: bytes | bytearray | array | memoryview,
+                 cells_num: tuple[int, int] = CELLS_NUM) -> None:
+        if len(palette) > MAX_COLORS_NUM:
+            raise ValueError(f'Pixel art can only contain a maximum of {MAX_COLORS_NUM} colors')
+        if not (0 < cells_num[0] <= MAX_CELLS_NUM[0] and 0 < cells_num[1] <= MAX_CELLS_NUM[1]):
+            raise ValueError(f'Pixel art size can not be bigger than {MAX_CELLS_NUM[0]}x{MAX_CELLS_NUM[1]}')
+        self._palette = tuple(palette)  # 0xRRGGBB integers
+        self._colors = tuple(QColor(rgb) for rgb in self._palette)
+        self._grid = memoryview(grid).cast('B')
+        self._cells_num = tuple(cells_num)
+        if len(self._grid) != cells_num[0] * cells_num[1]:
+            raise ValueError(f'Grid of {cells_num[0]}x{cells_num[1]} pixel art must contain '
+                             f'{cells_num[0] * cells_num[1]} cells, got {len(self._grid)} instead')
+
+    @classmethod
+    def from_colors(cls, colors: dict[int, QColor], cells_num: tuple[int, int] = CELLS_NUM) -> PackedArt:
+        palette = {}  # rgb -> grid value, keeps colors order
+        grid = bytearray(cells_num[0] * cells_num[1])
+        for idx, color in colors.items():
+            grid[idx] = palette.setdefault(color.rgb() & 0xFFFFFF, len(palette) + 1)
+        return cls(tuple(palette), grid, cells_num)
+
+    @classmethod
+    def from_rgb(cls, values: Sequence[int], cells_num: tuple[int, int]) -> PackedArt:
+        # values are QRgb integers for every cell, 0 for empty ones
+        palette = tuple(rgb for rgb in dict.fromkeys(values) if rgb)
+        if len(palette) > MAX_COLORS_NUM:
+            raise ValueError(f'Pixel art can only contain a maximum of {MAX_COLORS_NUM} colors')
+        lookup = dict((rgb, idx) for idx, rgb in enumerate(palette, start=1))
+        lookup[0] = 0
+        return cls(tuple(rgb & 0xFFFFFF for rgb in palette), bytes(map(lookup.__getitem__, values)), cells_num)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes, cells_num: tuple[int, int] = CELLS_NUM) -> PackedArt:
+        view = memoryview(blob)
+        palette_end = 1 + view[0] * 3
+        palette = tuple(int.from_bytes(view[idx:idx + 3], 'big') for idx in range(1, palette_end, 3))
+        return cls(palette, view[palette_end:], cells_num)
+
+    def to_bytes(self) -> bytes:
+        header = bytearray([len(self._palette)])
+        for rgb in self._palette:
+            header += rgb.to_bytes(3, 'big')
+        return bytes(header) + self._grid.tobytes()
 
-    def __init__(self, template_cells_table: str = ...) -> None:
-        if not isinstance(template_cells_table, str):
-            template_cells_table = '{}_cells'
-        self._cursor = self._get_cursor()
-        self._tpl = template_cells_table
+    @property
+    def palette(self) -> tuple[QColor, ...]:
+        return self._colors
 
-    @staticmethod
-    def _get_cursor() -> sqlite3.Cursor:
+    @property
+    def grid(self) -> memoryview:
+        return self._grid
+
+    @property
+    def cells_num(self) -> tuple[int, int]:
+        return self._cells_num
+
+    def to_rgb(self) -> array:
+        # QRgb integer for every cell, 0 for empty ones
+        lookup = [0, *(color.rgb() for color in self._colors)]
+        return array('I', map(lookup.__getitem__, self._grid))
+
+    def __len__(self) -> int:
+        return len(self._grid)
+
+    def __iter__(self) -> Iterator[tuple[int, QColor]]:  # yields (index, color) pairs of painted cells only
+        colors = self._colors
+        for idx, value in enumerate(self._grid):
+            if value:
+                yield idx, colors[value - 1]
+
+
+class TimeSketch:
+    """
+    Streaming quantiles of run times. Times are counted in buckets growing by ACCURACY, so any quantile
+    is known within ACCURACY relative error, while sketch size depends on range of times, not on their number.
+
+    Serialized layout is array of signed 32-bit integers: [index of the first bucket][count of every bucket].
+    """
+
+    ACCURACY = 0.01
+    _GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+    _MIN_TIME = 0.001  # seconds, less times are counted as it
+
+    def __init__(self, first: int = 0, counts: array = ...) -> None:
+        self._first = first  # bucket index of counts[0]
+        self._counts = counts if counts != Ellipsis else array('i')
+        self.count = sum(self._counts)
+
+    def to_bytes(self) -> bytes:
+        return array('i', [self._first]).tobytes() + self._counts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> TimeSketch:
+        values = array('i')
+        values.frombytes(data)
+        return cls(values[0], values[1:])
+
+    def add(self, time: float) -> None:
+        index = math.ceil(math.log(max(time, self._MIN_TIME), self._GAMMA))
+        if not self._counts:
+            self._first = index
+            self._counts.append(0)
+        elif index < self._first:
+            self._counts[:0] = array('i', [0]) * (self._first - index)
+            self._first = index
+        elif index >= self._first + len(self._counts):
+            self._counts.extend(array('i', [0]) * (index - self._first - len(self._counts) + 1))
+        self._counts[index - self._first] += 1
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return
+        rank, seen = q * (self.count - 1), 0
+        for offset, count in enumerate(self._counts):
+            seen += count
+            if seen > rank:
+                break
+        # middle of the bucket (in terms of relative error) between GAMMA^(index - 1) and GAMMA^index
+        return 2 * self._GAMMA ** (self._first + offset) / (self._GAMMA + 1)
+
+
+class RunStats(NamedTuple):
+    """Aggregates of finished runs of an art, which are updated on every run (check DataBase.add_run method)"""
+
+    count: int
+    best: float  # seconds
+    mean: float
+    median: float
+    last: tuple[float, ...]  # times of the last LAST_NUM runs, the latest first
+
+    LAST_NUM = 10
+
+    @property
+    def last_mean(self) -> float:
+        return sum(self.last) / len(self.last)
+
+    def describe(self) -> str:  # shown next to best time of art
+        return (f'Last {len(self.last)}: {Timer.to_str(round(self.last_mean * 1000))}\n'
+                f'Median: {Timer.to_str(round(self.median * 1000))}')
+
+    @classmethod
+    def from_row(cls, count: int, best: float, mean: float, median: float, last: bytes) -> RunStats:
+        return cls(count, best, mean, median, tuple(array('d', last)))
+
+
+class ArtSummary(NamedTuple):
+    name: str
+    time: float | str
+    is_prepared: bool
+    id: int  # pagination key (check DataBase.get_art_summaries method)
+    stats: RunStats | None = None  # None if art has no finished runs
+
+
+class ConnectionPool:
+    """
+    Process-wide sqlite connections for a single database file.
+    Every thread gets its own persistent connection, which is created on first use and reused for every query.
+    Connections keep compiled statements cached, so queries should be parametrized instead of formatted.
+    """
+
+    _pools: dict[str, ConnectionPool] = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, url: str, cache_size: int = -8000, cached_statements: int = 256) -> None:
+        self._url = url
+        self._cache_size = cache_size  # negative value is the cache size in KiB
+        self._cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.migrated = False  # set by DataBase after schema migrations are applied
+
+    @classmethod
+    def get(cls, url: str = DB_URL) -> ConnectionPool:
+        with cls._pools_lock:
+            if url not in cls._pools:
+                cls._pools[url] = cls(url)
+            return cls._pools[url]
+
+    @classmethod
+    def close_all(cls) -> None:
+        with cls._pools_lock:
+            for pool in cls._pools.values():
+                pool.close()
+            cls._pools.clear()
+
+    @property
+    def url(self) -> str:
+        return self._url
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _connect(self) -> sqlite3.Connection:
         try:
-            with sqlite3.connect(DB_URL) as connection:
-                return connection.cursor()
+            # transactions are managed explicitly (check DataBase._transaction method)
+            connection = sqlite3.connect(self._url, isolation_level=None, check_same_thread=False,
+                                         cached_statements=self._cached_statements)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')  # durable enough in WAL mode, fsync on checkpoints only
+            connection.execute(f'PRAGMA cache_size = {self._cache_size}')
+            connection.execute('PRAGMA temp_store = MEMORY')
+            connection.execute('PRAGMA foreign_keys = ON')
         except sqlite3.Error:
-            raise ConnectionAbortedError(f'Could not connect to "{DB_URL}" database') from None
+            raise ConnectionAbortedError(f'Could not connect to "{self._url}" database') from None
+
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._connections:
+                try:
+                    connection.execute('PRAGMA optimize')
+                    connection.close()
+                except sqlite3.Error:
+                    continue
+            self._connections.clear()
+        self._local = threading.local()
+
+
+atexit.register(ConnectionPool.close_all)
+
+
+class Settings:
+    """
+    In-memory settings of a single database, loaded once on first access and shared by all DataBase objects.
+    Values are typed: they are parsed to the type of their default value (check SETTINGS constant).
+    Changes are written behind: they are coalesced and flushed in a single transaction
+    with a delay (if Qt application is running) and at exit.
+    """
+
+    _stores: dict[str, Settings] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, db: DataBase, delay: int = 1000) -> None:
+        self._db = db
+        self._delay = delay  # ms
+        self._values: dict[str, Any] | None = None  # loaded on first access
+        self._pending: dict[str, Any] = {}  # changed values, which are not written yet
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, db: DataBase) -> Settings:
+        with cls._stores_lock:
+            if db.url not in cls._stores:
+                cls._stores[db.url] = cls(db)
+            return cls._stores[db.url]
+
+    @classmethod
+    def flush_all(cls) -> None:
+        with cls._stores_lock:
+            for store in cls._stores.values():
+                store.flush()
+
+    @staticmethod
+    def _parse(setting: str, value: str | None) -> Any:
+        default = SETTINGS.get(setting)
+        if value is None or default is None or isinstance(default, str):
+            return default if value is None else value
+        if isinstance(default, bool):
+            return value.lower() in ('1', 'true')
+        return type(default)(value)
+
+    @staticmethod
+    def _format(value: Any) -> str:
+        return str(int(value)) if isinstance(value, bool) else str(value)
+
+    @property
+    def _loaded(self) -> dict[str, Any]:
+        if self._values is None:
+            self._values = dict(SETTINGS)
+            for setting, value in self._db.get_raw_settings():
+                self._values[setting.lower()] = self._parse(setting.lower(), value)
+        return self._values
+
+    def __getitem__(self, setting: str) -> Any:
+        with self._lock:
+            return self._loaded[setting.lower()]
+
+    def values(self, *settings: str) -> dict[str, Any]:  # all settings, if none are specified
+        with self._lock:
+            values = self._loaded
+            return {setting: values[setting.lower()] for setting in settings} if settings else dict(values)
+
+    def update(self, **settings: Any) -> None:
+        with self._lock:
+            values = self._loaded
+            for setting, value in settings.items():
+                setting = setting.lower()
+                if setting not in values:
+                    raise KeyError(f'Unknown setting "{setting}"')
+                if values[setting] == value:
+                    continue
+                if not self._pending and QApplication.instance() is not None:
+                    QTimer.singleShot(self._delay, self.flush)  # changes made until timeout are flushed together
+                values[setting] = self._pending[setting] = value
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if pending:
+                self._db.write_raw_settings({setting: self._format(value) for setting, value in pending.items()})
+
+
+atexit.register(Settings.flush_all)  # registered after ConnectionPool.close_all, so runs before it
+
+
+class DataBase:
+    # Every migration upgrades the schema by one version (stored in "PRAGMA user_version").
+    # Version 0 is either an empty file or the legacy layout with a separate "{Name}_cells" table per art
+    _MIGRATIONS = (
+        '_migrate_to_cells_table',
+        '_migrate_to_packed_cells',
+        '_migrate_add_prepared_index',
+        '_migrate_add_cells_num',
+        '_migrate_add_runs',
+    )
+
+    # DataBase objects are lightweight, all instances for the same url share connections of a single pool
+    def __init__(self, template_cells_table: str = ..., url: str = ...) -> None:
+        if not isinstance(template_cells_table, str):
+            template_cells_table = '{}_cells'
+        self._pool = ConnectionPool.get(url if isinstance(url, str) else DB_URL)
+        self._tpl = template_cells_table  # used to find legacy cells tables while migrating
+        if not self._pool.migrated:
+            self._migrate()
+            self._pool.migrated = True
+
+    @property
+    def url(self) -> str:
+        return self._pool.url
+
+    @property
+    def _cursor(self) -> sqlite3.Cursor:
+        return self._pool.connection().cursor()
 
     @staticmethod
     def _to_db_format(s: str) -> str:
         return s.title().replace(' ', '')
 
-    def get_setting_value(self, setting: str) -> T:  # shortcut to get value from specified settings dictionary
-        return next(iter(self.get_settings(setting).values()))
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        connection = self._pool.connection()
+        connection.execute('BEGIN IMMEDIATE')  # takes write lock at once, so concurrent writers wait on busy timeout
+        try:
+            yield connection.cursor()
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _migrate(self) -> None:
+        # version is checked inside of write transaction, so concurrent processes never apply same migration twice
+        while True:
+            with self._transaction() as cursor:
+                version = cursor.execute('PRAGMA user_version').fetchone()[0]
+                if version >= len(self._MIGRATIONS):
+                    return
+                getattr(self, self._MIGRATIONS[version])()
+                cursor.execute(f'PRAGMA user_version = {version + 1}')
+
+    def _migrate_to_cells_table(self) -> None:
+        tables = set(row[0] for row in self._cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'"))
+
+        if SETTINGS_DB_TABLE_NAME not in tables:
+            self._cursor.execute(f'CREATE TABLE {SETTINGS_DB_TABLE_NAME} (setting TEXT NOT NULL, value TEXT)')
+            self._cursor.execute(f'INSERT INTO {SETTINGS_DB_TABLE_NAME} (setting, value) VALUES (?, ?)',
+                                 ('theme', 'dark'))
+
+        # arts table is recreated, because cells table needs a primary key to reference
+        self._cursor.execute(f'''CREATE TABLE {PIXELARTS_DB_TABLE_NAME}_new (
+                                    id INTEGER PRIMARY KEY,
+                                    name TEXT NOT NULL UNIQUE,
+                                    time,
+                                    is_prepared INTEGER NOT NULL DEFAULT 0
+                                 );''')
+        if PIXELARTS_DB_TABLE_NAME in tables:
+            self._cursor.execute(f'INSERT INTO {PIXELARTS_DB_TABLE_NAME}_new (name, time, is_prepared) '
+                                 f'SELECT name, time, is_prepared FROM {PIXELARTS_DB_TABLE_NAME} ORDER BY rowid')
+            self._cursor.execute(f'DROP TABLE {PIXELARTS_DB_TABLE_NAME}')
+        self._cursor.execute(f'ALTER TABLE {PIXELARTS_DB_TABLE_NAME}_new RENAME TO {PIXELARTS_DB_TABLE_NAME}')
+
+        self._cursor.execute(f'''CREATE TABLE Cells (
+                                    art_id INTEGER NOT NULL
+                                        REFERENCES {PIXELARTS_DB_TABLE_NAME} (id) ON DELETE CASCADE,
+                                    cell_index INTEGER NOT NULL,
+                                    color TEXT NOT NULL,
+                                    PRIMARY KEY (art_id, cell_index)
+                                 ) WITHOUT ROWID;''')
+
+        for art_id, name in self._cursor.execute(f'SELECT id, name FROM {PIXELARTS_DB_TABLE_NAME}').fetchall():
+            legacy_table = self._tpl.format(self._to_db_format(name))
+            if legacy_table not in tables:
+                continue
+            self._cursor.execute('INSERT INTO Cells (art_id, cell_index, color) '
+                                 f'SELECT ?, cell_index, color FROM "{legacy_table}"', (art_id,))
+            self._cursor.execute(f'DROP TABLE "{legacy_table}"')
+
+    def _migrate_to_packed_cells(self) -> None:
+        self._cursor.execute(f'ALTER TABLE {PIXELARTS_DB_TABLE_NAME} ADD COLUMN cells BLOB')
+
+        arts = {}
+        for art_id, idx, color in self._cursor.execute('SELECT art_id, cell_index, color FROM Cells').fetchall():
+            arts.setdefault(art_id, {})[idx] = QColor(color)
+        for art_id, colors in arts.items():
+            self._cursor.execute(f'UPDATE {PIXELARTS_DB_TABLE_NAME} SET cells = ? WHERE id = ?',
+                                 (PackedArt.from_colors(self._limit_colors(colors), (12, 12)).to_bytes(), art_id))
+
+        self._cursor.execute('DROP TABLE Cells')
 
-    def get_settings(self, *settings: str) -> dict[str, T]:
-        settings = tuple(map(str.lower, settings))
-        rows = self._cursor.execute(f'SELECT * FROM {SETTINGS_DB_TABLE_NAME}').fetchall()
+    @staticmethod
+    def _limit_colors(colors: dict[int, QColor]) -> dict[int, QColor]:
+        # Legacy colors limit did not count one color, so fully painted arts could have one more color.
+        # The most used colors are kept, cells of the other ones are painted with the nearest kept color
+        counts = Counter(color.rgb() for color in colors.values())
+        if len(counts) <= MAX_COLORS_NUM:
+            return colors
+        kept = [QColor.fromRgb(rgb) for rgb, _ in counts.most_common(MAX_COLORS_NUM)]
+
+        def nearest(color: QColor) -> QColor:
+            return min(kept, key=lambda other: (color.red() - other.red()) ** 2 + (color.green() - other.green()) ** 2
+                       + (color.blue() - other.blue()) ** 2)
+
+        return dict((idx, color if color in kept else nearest(color)) for idx, color in colors.items())
+
+    def _migrate_add_prepared_index(self) -> None:
+        # menu pages are filtered by is_prepared and ordered by id, so the index covers the whole query plan
+        self._cursor.execute(f'CREATE INDEX {PIXELARTS_DB_TABLE_NAME}_is_prepared '
+                             f'ON {PIXELARTS_DB_TABLE_NAME} (is_prepared, id)')
+
+    def _migrate_add_cells_num(self) -> None:
+        # arts saved before had the only available size
+        self._cursor.execute(f'ALTER TABLE {PIXELARTS_DB_TABLE_NAME} ADD COLUMN width INTEGER NOT NULL DEFAULT 12')
+        self._cursor.execute(f'ALTER TABLE {PIXELARTS_DB_TABLE_NAME} ADD COLUMN height INTEGER NOT NULL DEFAULT 12')
+
+    def _migrate_add_runs(self) -> None:
+        # every finished run is kept, aggregates are updated on insert, so they are read without scanning runs
+        self._cursor.execute(f'''CREATE TABLE Runs (
+                                    art_id INTEGER NOT NULL
+                                        REFERENCES {PIXELARTS_DB_TABLE_NAME} (id) ON DELETE CASCADE,
+                                    finished_at INTEGER NOT NULL,
+                                    time REAL NOT NULL,
+                                    PRIMARY KEY (art_id, finished_at)
+                                 ) WITHOUT ROWID;''')
+        self._cursor.execute(f'''CREATE TABLE RunStats (
+                                    art_id INTEGER PRIMARY KEY
+                                        REFERENCES {PIXELARTS_DB_TABLE_NAME} (id) ON DELETE CASCADE,
+                                    count INTEGER NOT NULL,
+                                    best REAL NOT NULL,
+                                    mean REAL NOT NULL,
+                                    median REAL NOT NULL,
+                                    last BLOB NOT NULL,
+                                    sketch BLOB NOT NULL
+                                 );''')
 
-        for row in rows:
-            setting_name = row[0].lower()
-            if setting_name not in settings:
-                rows.remove(row)
+    # settings are read from and written to in-memory store (check Settings class), which uses raw methods below
+    def get_setting_value(self, setting: str) -> T:
+        return Settings.get(self)[setting]
 
-        return dict(rows)
+    def get_settings(self, *settings: str) -> dict[str, T]:  # all settings, if none are specified
+        return Settings.get(self).values(*settings)
 
     def set_settings(self, **settings: T) -> None:
-        db_settings = self.get_settings(*settings.keys())
+        Settings.get(self).update(**settings)
 
-        for setting, value in settings.items():
-            if value == db_settings[setting.lower()]:
-                continue
-            self._cursor.execute(f'UPDATE {SETTINGS_DB_TABLE_NAME} SET value = ? '
-                                 f'WHERE setting = "{setting.lower()}" COLLATE NOCASE',
-                                 (settings[setting].lower(),))
-        self._cursor.connection.commit()
+    def get_raw_settings(self) -> list[tuple[str, str | None]]:
+        return self._cursor.execute(f'SELECT setting, value FROM {SETTINGS_DB_TABLE_NAME}').fetchall()
 
-    def get_art_row(self, name: str) -> tuple[str, int, dict[int, QColor], bool] | None:
-        row = self._cursor.execute(f'SELECT * FROM {PIXELARTS_DB_TABLE_NAME} WHERE name = "{name}"').fetchone()
+    def write_raw_settings(self, settings: dict[str, str]) -> None:
+        with self._transaction() as cursor:
+            for setting, value in settings.items():
+                cursor.execute(f'UPDATE {SETTINGS_DB_TABLE_NAME} SET value = ? WHERE setting = ? COLLATE NOCASE',
+                               (value, setting))
+                if not cursor.rowcount:  # settings added after database was created have no rows yet
+                    cursor.execute(f'INSERT INTO {SETTINGS_DB_TABLE_NAME} (setting, value) VALUES (?, ?)',
+                                   (setting, value))
+
+    def get_art_row(self, name: str) -> tuple[str, int, PackedArt, bool] | None:
+        row = self._cursor.execute(f'SELECT time, is_prepared, cells, width, height FROM {PIXELARTS_DB_TABLE_NAME} '
+                                   f'WHERE name = ?', (name,)).fetchone()
 
         if row is None:
             return
 
-        try:
-            fetched = self._cursor.execute(f'SELECT * FROM {self._tpl.format(self._to_db_format(name))}').fetchall()
-            cells = dict((index, QColor(color)) for index, color in fetched)
-        except sqlite3.OperationalError:
-            raise SystemError(f'Could not get cells data for "{name}" art. Most likely it have been lost') from None
+        if not row[2]:
+            raise SystemError(f'Could not get cells data for "{name}" art. Most likely it have been lost')
+
+        return name, row[0], PackedArt.from_bytes(row[2], (row[3], row[4])), bool(row[1])
 
-        return name, row[1], cells, bool(row[2])
+    @staticmethod
+    def _where(conditions: dict[str, Any], *clauses: str) -> str:
+        # only column names are formatted into the query, so it's text (and compiled statement) is reused
+        clauses = (*map(lambda column: f'{column} = ?', conditions), *clauses)
+        return ' WHERE ' + ' AND '.join(clauses) if clauses else ''
 
     def get_art_names(self, limit: int = None, offset: int = 0, **conditions: Any) -> tuple[str]:
-        limit = f' LIMIT {limit}' if limit else ''
-        offset = f' OFFSET {offset}' if offset else ''
-        conditions = ' WHERE ' + ' AND '.join(map(lambda item: f'{item[0]} = {item[1]}', conditions.items())) \
-            if conditions else ''
-        query = f'SELECT name FROM {PIXELARTS_DB_TABLE_NAME}{conditions}{limit}{offset}'
-        return tuple(map(lambda x: x[0], self._cursor.execute(query).fetchall()))  # type: ignore
-
-    def save_art_row(self, name: str, time: float, fill: dict[int, QColor] = ...) -> None:
-        row = self.get_art_row(name)
-
-        if fill == Ellipsis:
-            try:
-                fill = row[2]
-            except TypeError:
-                raise ValueError('fill argument must be provided to save new arts') from None
+        query = f'SELECT name FROM {PIXELARTS_DB_TABLE_NAME}{self._where(conditions)} LIMIT ? OFFSET ?'
+        params = (*conditions.values(), limit or -1, offset)
+        return tuple(map(lambda x: x[0], self._cursor.execute(query, params).fetchall()))  # type: ignore
+
+    def get_art_summaries(self, limit: int = None, after_id: int = 0, **conditions: Any) -> tuple[ArtSummary, ...]:
+        # Arts info without cells, so whole page of arts is fetched with a single query.
+        # Pages are keyset paginated: next page starts after id of the last summary from previous one,
+        # so deep pages are as cheap as the first one (OFFSET would walk all the skipped rows)
+        query = (f'SELECT name, time, is_prepared, id, count, best, mean, median, last '
+                 f'FROM {PIXELARTS_DB_TABLE_NAME} LEFT JOIN RunStats ON art_id = id'
+                 f'{self._where(conditions, "id > ?")} ORDER BY id LIMIT ?')
+        params = (*conditions.values(), after_id, limit or -1)
+        return tuple(ArtSummary(name, time, bool(is_prepared), art_id, RunStats.from_row(*stats) if stats[0] else None)
+                     for name, time, is_prepared, art_id, *stats in self._cursor.execute(query, params).fetchall())
+
+    def save_art_row(self, name: str, time: float, fill: PackedArt = ...) -> None:
+        art_id = self._get_art_id(name)
+
+        if fill == Ellipsis and art_id is None:
+            raise ValueError('fill argument must be provided to save new arts')
+
+        try:
+            with self._transaction():
+                self._save_art_row(art_id, name, time, fill)
+        except sqlite3.Error:
+            raise ValueError('Invalid data') from None
 
+    def save_art_rows(self, rows: Iterable[tuple[str, float | str, PackedArt]]) -> None:
+        # (name, time, fill) rows are saved in a single transaction: all of them or none
         try:
-            self._delete_cells_table(name)
-            self._create_cells_table(name, fill)
-            if row is None:
-                self._create_art_row(name, time)
-            else:
-                self._update_art_row(row, time)
+            with self._transaction():
+                for name, best_time, fill in rows:
+                    self._save_art_row(self._get_art_id(name), name, best_time, fill)
         except sqlite3.Error:
-            raise ValueError('Invalid data')
-        self._cursor.connection.commit()
+            raise ValueError('Invalid data') from None
+
+    def _save_art_row(self, art_id: int | None, name: str, time: float | str, fill: PackedArt = ...) -> None:
+        if art_id is None:
+            art_id = self._create_art_row(name, time)
+        else:
+            self._update_art_row(art_id, time, replaced=fill != Ellipsis)
+            if fill != Ellipsis:  # runs of the replaced art are not runs of the new one
+                self._delete_runs(art_id)
+        if fill != Ellipsis:  # cells are rewritten only if they have been changed
+            self._update_cells(art_id, fill)
 
     def delete_art_row(self, name: str) -> None:
-        self._cursor.execute(f'DELETE FROM {PIXELARTS_DB_TABLE_NAME} WHERE name = "{name}"')
-        self._delete_cells_table(name)
-        self._cursor.connection.commit()
+        with self._transaction():
+            self._cursor.execute(f'DELETE FROM {PIXELARTS_DB_TABLE_NAME} WHERE name = ?', (name,))
+
+    def _get_art_id(self, name: str) -> int | None:
+        row = self._cursor.execute(f'SELECT id FROM {PIXELARTS_DB_TABLE_NAME} WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
 
-    def _update_art_row(self, row: tuple[str, float, dict[int, QColor], bool], time: float) -> None:
-        query = f'UPDATE {PIXELARTS_DB_TABLE_NAME} SET time = ? WHERE name = "{row[0]}"'
-        self._cursor.execute(query, (time if time != NOT_PROVIDED else row[1],))
+    def _update_art_row(self, art_id: int, time: float, replaced: bool = False) -> None:
+        # best time of the replaced art is not best time of the new one, so it is reset even if it is not provided
+        if time == NOT_PROVIDED and not replaced:
+            return
+        self._cursor.execute(f'UPDATE {PIXELARTS_DB_TABLE_NAME} SET time = ? WHERE id = ?', (time, art_id))
 
-    def _create_art_row(self, name: str, time: float) -> None:
+    def _create_art_row(self, name: str, time: float) -> int:
         query = f'INSERT INTO {PIXELARTS_DB_TABLE_NAME} (name, time, is_prepared) VALUES (?, ?, ?)'
-        self._cursor.execute(query, (name, time, False))
+        return self._cursor.execute(query, (name, time, False)).lastrowid
+
+    def _update_cells(self, art_id: int, fill: PackedArt) -> None:
+        self._cursor.execute(f'UPDATE {PIXELARTS_DB_TABLE_NAME} SET cells = ?, width = ?, height = ? WHERE id = ?',
+                             (fill.to_bytes(), *fill.cells_num, art_id))
+
+    def _delete_runs(self, art_id: int) -> None:
+        self._cursor.execute('DELETE FROM Runs WHERE art_id = ?', (art_id,))
+        self._cursor.execute('DELETE FROM RunStats WHERE art_id = ?', (art_id,))
+
+    def add_run(self, name: str, time: float, finished_at: int) -> None:
+        # finished_at is unix time in ms, the last runs are the last added ones
+        art_id = self._get_art_id(name)
+        if art_id is None:
+            raise ValueError(f'Art with name "{name}" is not saved')
+
+        with self._transaction() as cursor:
+            cursor.execute('INSERT OR IGNORE INTO Runs (art_id, finished_at, time) VALUES (?, ?, ?)',
+                           (art_id, finished_at, time))
+            if not cursor.rowcount:  # the same run was already added
+                return
+
+            row = cursor.execute('SELECT count, best, mean, last, sketch FROM RunStats WHERE art_id = ?',
+                                 (art_id,)).fetchone()
+            count, best, mean, last, sketch = row or (0, time, 0.0, b'', b'')
+            sketch = TimeSketch.from_bytes(sketch) if sketch else TimeSketch()
+            sketch.add(time)
+            last = array('d', [time]) + array('d', last)[:RunStats.LAST_NUM - 1]
+            count += 1
+            cursor.execute('INSERT OR REPLACE INTO RunStats (art_id, count, best, mean, median, last, sketch) '
+                           'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           (art_id, count, min(best, time), mean + (time - mean) / count, sketch.quantile(0.5),
+                            last.tobytes(), sketch.to_bytes()))
+
+    def get_run_stats(self, name: str) -> RunStats | None:
+        row = self._cursor.execute(f'SELECT count, best, mean, median, last FROM RunStats '
+                                   f'JOIN {PIXELARTS_DB_TABLE_NAME} ON art_id = id WHERE name = ?', (name,)).fetchone()
+        return RunStats.from_row(*row) if row else None
+
+
+class Persistence(QObject):
+    """
+    Writes arts through a background queue (with its own database connection), so GUI thread never waits for disk.
+    Best time updates of an art, which are still waiting in queue, are merged into one.
+    Results are reported through signals, which are delivered to GUI thread.
+    """
+
+    written = pyqtSignal(str)  # name of art, which job is done
+    failed = pyqtSignal(str, str)  # name of art and error message
+
+    def __init__(self, url: str = ...) -> None:
+        super().__init__()
 
-    def _delete_cells_table(self, name: str) -> None:
-        self._cursor.execute(f'DROP TABLE IF EXISTS {self._tpl.format(self._to_db_format(name))}')
+        self._url = url
+        self._db: DataBase | None = None  # created on first job, so modules may point DB_URL elsewhere before
+        self._pb_jobs: dict[str, list] = {}  # art name -> arguments of its queued best time job
+        self._queue = BackgroundQueue('persistence', self._run_job, self._take_job)
+
+    def _submit(self, method: str, name: str, *args: Any, ordered: bool = True) -> list:
+        with self._queue.lock:
+            if self._db is None:
+                self._db = DataBase(url=self._url)
+            job = [name, *args]
+            self._queue.submit((getattr(self._db, method), job))  # (DataBase method, arguments)
+            if ordered:  # best time saved after other job should not be merged into one before it
+                self._pb_jobs.pop(name, None)
+            return job
+
+    def save_pb(self, name: str, time: float) -> None:
+        with self._queue.lock:
+            job = self._pb_jobs.get(name)
+            if job is not None:
+                job[1] = time  # merged into queued job
+                return
+            self._pb_jobs[name] = self._submit('save_art_row', name, time)
+
+    def save(self, name: str, time: float | str, fill: PackedArt) -> None:
+        self._submit('save_art_row', name, time, fill)
+
+    def save_run(self, name: str, time: float, finished_at: int) -> None:
+        self._submit('add_run', name, time, finished_at, ordered=False)  # runs do not depend on best time
+
+    def delete(self, name: str) -> None:
+        self._submit('delete_art_row', name)
+
+    def _take_job(self, jobs: deque[tuple[Callable, list]]) -> tuple[Callable, tuple]:
+        method, job = jobs.popleft()
+        if self._pb_jobs.get(job[0]) is job:
+            del self._pb_jobs[job[0]]
+        return method, tuple(job)
+
+    def _run_job(self, job: tuple[Callable, tuple]) -> None:
+        method, args = job
+        try:
+            method(*args)
+        except (ValueError, sqlite3.Error) as e:
+            self.failed.emit(args[0], str(e))
+        else:
+            self.written.emit(args[0])
 
-    def _create_cells_table(self, name: str, fill: dict[int, QColor]) -> None:
-        name = self._tpl.format(self._to_db_format(name))
-        self._cursor.execute(f'''CREATE TABLE {name} (
-                                    cell_index INTEGER NOT NULL,
-                                    color TEXT NOT NULL
-                                 );''')
-        values = ', '.join([f'({idx}, "{clr.name()}")' for idx, clr in fill.items()])
-        self._cursor.execute(f'INSERT INTO {name} (cell_index, color) VALUES {values}')
+    def close(self) -> None:  # blocks until every submitted job is done
+        self._queue.close()
+
+
+navigator = Navigator()
+persistence = Persistence()
+atexit.register(persistence.close)  # registered after ConnectionPool.close_all, so runs before it
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+SOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'SpeedPixels')
+sys.path.append(SOURCES_DIR)  # modules import each other as top-level ones
+
+
+@pytest.fixture(scope='session')
+def qt_app(tmp_path_factory: pytest.TempPathFactory):
+    # offscreen application, databases and recordings of modules are pointed to temporary ones before they are used
+    pytest.importorskip('PyQt5.QtWidgets')
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+
+    import recording
+    import utils
+
+    utils.DB_URL = str(tmp_path_factory.mktemp('db') / 'db.sqlite3')
+    recording.RUNS_URL = str(tmp_path_factory.mktemp('runs'))
+    return QApplication.instance() or QApplication(sys.argv[:1])
@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+from array import array
+
+from board import BoardState, Click, is_pb
+
+SOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'SpeedPixels')
+
+# PyQt5 imports fail, as if it was not installed, then game rules are run and a recorded run is replayed
+NO_QT_SCRIPT = '''
+import sys
+from array import array
+
+class NoQt:
+    def find_spec(self, name, path=None, target=None):
+        if name.partition('.')[0] == 'PyQt5':
+            raise ImportError(f'{name} is not available')
+
+sys.meta_path.insert(0, NoQt())
+
+from board import BoardState, Click
+from recording import RunRecorder, verify
+
+class Writer:
+    def append(self, path, data):
+        pass
+
+    def prune(self, directory):
+        pass
+
+board = BoardState((2, 2))
+board.set_saved_colors(array('I', [1, 2, 0, 1]))
+recorder = RunRecorder(Writer())
+recorder.start('art', board)
+assert board.click(0, 2) == Click.IGNORED
+for ms, index, rgb in ((100, 0, 1), (250, 3, 1), (400, 1, 2)):
+    board.click(index, rgb)
+    recorder.click(ms, index, rgb)
+assert board.is_filled
+assert verify(recorder.finish(450), board.saved_colors, '0.45')
+assert not any(name.startswith('PyQt5') for name in sys.modules)
+'''
+
+
+def test_board_runs_without_qt() -> None:
+    result = subprocess.run([sys.executable, '-c', NO_QT_SCRIPT], cwd=SOURCES_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def _board(saved: list[int], max_colors: int = 9) -> BoardState:
+    board = BoardState((2, len(saved) // 2), max_colors)
+    board.set_saved_colors(array('I', saved))
+    return board
+
+
+def test_click_rules() -> None:
+    board = _board([1, 2, 0, 1])
+    assert board.click(0, 2) == Click.IGNORED  # another color is saved in the cell
+    assert board.click(2, 0) == Click.IGNORED  # painting with empty color
+    assert board.click(0, 1) == Click.PAINTED
+    assert board.click(0, 5) == Click.ERASED  # painted cell is erased by any color
+    assert board.colors[0] == 0 and board.mismatched == 3
+
+    assert board.click(2, 7) == Click.PAINTED  # cell without saved color may be painted with any color
+    assert board.click(2, 7) == Click.ERASED
+    for index, rgb in ((0, 1), (1, 2)):
+        assert board.click(index, rgb) == Click.PAINTED
+    assert board.click(3, 1) == Click.FILLED and board.is_filled
+
+
+def test_overflow_is_reverted() -> None:
+    board = _board([0, 0, 0, 0], max_colors=2)
+    board.click(0, 1)
+    board.click(1, 2)
+    assert board.click(2, 3) == Click.OVERFLOW
+    assert board.colors.tolist() == [1, 2, 0, 0] and board.histogram == {1: 1, 2: 1}
+
+
+def test_counters() -> None:
+    board = _board([1, 2, 0, 1])
+    assert (board.mismatched, board.saved_num, board.palette) == (3, 3, (1, 2))
+
+    board.set_colors(array('I', [1, 3, 3, 0]))
+    assert board.mismatched == 3 and board.histogram == {1: 1, 3: 2}
+
+    board.paint()  # painted colors become saved ones
+    assert board.saved_colors.tolist() == [1, 3, 3, 0] and board.palette == (1, 3)
+    assert (board.mismatched, board.saved_num, board.histogram) == (3, 3, {})
+
+    board.clear()
+    assert (board.mismatched, board.saved_num, board.histogram, board.palette) == (0, 0, {}, ())
+    assert not board.is_saved and not board.is_filled
+
+
+def test_is_pb() -> None:
+    assert is_pb(1000, '-') and is_pb(1000, 1.5) and not is_pb(1500, '1.5')
@@ -0,0 +1,43 @@
+from array import array
+
+
+class Writer:
+    def append(self, path: str, data: bytes) -> None:
+        pass
+
+    def prune(self, directory: str) -> None:
+        pass
+
+
+def test_recorded_clicks_verify(qt_app) -> None:
+    # clicks go through Qt signals, so QRgb values of opaque colors (above signed int range) should survive them
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QColor
+    from PyQt5.QtTest import QTest
+    from PyQt5.QtWidgets import QApplication, QWidget
+
+    from arts import Field
+    from recording import RunRecorder, verify
+
+    art = QWidget()
+    art.resize(400, 400)
+    field = Field(art, (2, 2))
+    saved = array('I', [QColor(200, 30, 30).rgb(), QColor(30, 30, 200).rgb(), 0, QColor(200, 30, 30).rgb()])
+    field.board.set_saved_colors(saved)
+    art.show()
+    QApplication.processEvents()
+
+    recorder = RunRecorder(Writer())
+    recorder.start('art', field.board)
+    times = iter(range(100, 10 ** 6, 100))
+    field.clicked.connect(lambda index, rgb: recorder.click(next(times), index, rgb))
+    filled = []
+    field.filled.connect(lambda: filled.append(True))
+
+    grid = field._grid
+    for index in (0, 3, 1):
+        art.user_color = QColor.fromRgb(saved[index])
+        QTest.mouseClick(grid, Qt.LeftButton, pos=grid.cell_rect(index).center())
+
+    assert filled
+    assert verify(recorder.finish(400), saved, 0.4)
@@ -0,0 +1,21 @@
+import sqlite3
+
+
+def test_legacy_art_with_ten_colors(qt_app, tmp_path) -> None:
+    # legacy colors limit let a fully painted 12x12 art have 10 colors, it is reduced to 9 instead of failing
+    from utils import DataBase
+
+    url = str(tmp_path / 'legacy.sqlite3')
+    colors = [f'#{rgb:06x}' for rgb in (0x100000, 0x300000, 0x500000, 0x700000, 0x900000,
+                                        0xb00000, 0xd00000, 0xf00000, 0x00ff00, 0x10ff00)]
+    with sqlite3.connect(url) as connection:
+        connection.execute('CREATE TABLE ArtsInfo (name TEXT, time, is_prepared INTEGER)')
+        connection.execute("INSERT INTO ArtsInfo VALUES ('many colors', '-', 0)")
+        connection.execute('CREATE TABLE ManyColors_cells (cell_index INTEGER, color TEXT NOT NULL)')
+        connection.executemany('INSERT INTO ManyColors_cells VALUES (?, ?)',
+                               ((idx, colors[idx % 9 if idx != 143 else 9]) for idx in range(144)))
+    connection.close()
+
+    art = DataBase(url=url).get_art_row('many colors')[2]
+    assert len(art.palette) == 9
+    assert len(art) == 144 and art.to_rgb()[143] == art.to_rgb()[8]  # the rarest color became the nearest one
@@ -0,0 +1,24 @@
+def test_queued_best_times_are_merged(qt_app, tmp_path) -> None:
+    # best times queued behind a slow job are written once, runs queued between them do not prevent it
+    from PyQt5.QtWidgets import QApplication
+
+    from utils import DataBase, PackedArt, Persistence
+
+    url = str(tmp_path / 'db.sqlite3')
+    persistence = Persistence(url)
+    written = []
+    persistence.written.connect(written.append)
+
+    with persistence._queue.lock:  # background thread waits for it, as if a slow job was running
+        persistence.save('art', '-', PackedArt((0xff0000,), bytes([1]) * 144))
+        persistence.save_pb('art', 2.0)
+        persistence.save_run('art', 2.0, 1)
+        persistence.save_pb('art', 1.5)
+        persistence.save_run('art', 1.5, 2)
+    persistence.close()
+    QApplication.processEvents()  # signals are delivered from background thread
+
+    assert written == ['art'] * 4  # art, merged best time and two runs
+    db = DataBase(url=url)
+    assert db.get_art_row('art')[1] == 1.5
+    assert db.get_run_stats('art').count == 2
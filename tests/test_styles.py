@@ -0,0 +1,45 @@
+def _rendered(widget) -> set:
+    from PyQt5.QtGui import QColor
+
+    image = widget.grab().toImage()
+    return set(QColor(image.pixel(x, y)).name() for x in range(image.width()) for y in range(image.height()))
+
+
+def test_label_text_color(qt_app) -> None:
+    # labels in a window with background stylesheet get text color through palette, even after window is restyled
+    from PyQt5.QtGui import QFont
+    from PyQt5.QtWidgets import QLabel, QWidget
+
+    from utils import update_stylesheet
+
+    window = QWidget()
+    window.setStyleSheet('background-color: #545454;')
+    label = QLabel('█' * 4, window)
+    label.setFont(QFont('', 30))
+    window.show()
+
+    update_stylesheet(label, 'color: #ff0000;')
+    assert not label.styleSheet() and '#ff0000' in _rendered(label)
+
+    window.setStyleSheet('background-color: #ffffff;')  # resets palette of children, as theme switch does
+    update_stylesheet(label, 'color: #ff0000;')
+    assert '#ff0000' in _rendered(label)
+
+    update_stylesheet(label, 'background-color: #0000ff;')  # stylesheet keeps the color set before
+    assert {'#ff0000', '#0000ff'} <= _rendered(label)
+
+
+def test_label_text_color_styled_by_ancestor(qt_app) -> None:
+    from PyQt5.QtGui import QFont
+    from PyQt5.QtWidgets import QLabel, QWidget
+
+    from utils import update_stylesheet
+
+    window = QWidget()
+    window.setStyleSheet('QLabel { color: #00ff00; }')
+    label = QLabel('█' * 4, window)
+    label.setFont(QFont('', 30))
+    window.show()
+
+    update_stylesheet(label, 'color: #ff0000;')
+    assert label.styleSheet() and '#ff0000' in _rendered(label)